@@ -0,0 +1,63 @@
+"""控件内存占用基准测试
+
+分别创建N个各类控件，统计平均每个控件占用的堆内存，
+最后把N个按钮添加到列表视图并绘制一次，统计绘制后的占用。
+在修改控件实现前后分别运行，比较输出结果。
+没有硬件时(如MicroPython的unix端口)使用虚拟屏幕，在仓库根目录运行：
+MICROPYPATH=.:.frozen micropython demos/benchmarks/widget_memory.py
+"""
+
+import gc
+from gui import ufont
+from gui.utils.core import *
+from gui.xt_gui import XT_GUI
+from gui.widgets.base import XWidget, XCtrl, XFrameLayout, XText
+from gui.widgets.buttons import XButton, XCheckbox
+from gui.widgets.containers import XListView
+
+try:
+    import setup_hardware
+
+    display = setup_hardware.display
+except ImportError:  # 没有machine模块
+    from driver.virtual_display import VirtualDisplay
+
+    display = DisplayAPI(VirtualDisplay())
+
+N = 100
+
+GUI = XT_GUI(
+    display,
+    ufont.BMFont("./resource/fonts/for_demo/16x16_text_demo.bmf", load_into_mem=True),
+)
+
+
+def measure(name, create):
+    widgets = [None] * N  # 预先分配，不计入控件占用
+    gc.collect()
+    free = gc.mem_free()
+    for i in range(N):
+        widgets[i] = create()
+    gc.collect()
+    used = free - gc.mem_free()
+    print(f"{name:<24}{used:>8} B{used // N:>6} B/widget")
+    return widgets
+
+
+print(f"N = {N}")
+measure("XWidget", lambda: XWidget((0, 0), (10, 10)))
+measure("XCtrl", lambda: XCtrl((0, 0), (10, 10)))
+measure("XText", lambda: XText((0, 0), "text"))
+measure("XFrameLayout", lambda: XFrameLayout((0, 0), (10, 10)))
+measure("XButton", lambda: XButton((0, 0), text="text"))
+measure("XCheckbox", lambda: XCheckbox((0, 0), (49, 16), 16, text="text"))
+
+listview = XListView((0, 0), (240, 240))
+GUI.add_widget(listview)
+gc.collect()
+free = gc.mem_free()
+listview.add_widgets([XButton((0, 0), text="text") for _ in range(N)])
+GUI._top_layer_layout._draw_deliver()
+gc.collect()
+used = free - gc.mem_free()
+print(f"{'XButton drawn in list':<24}{used:>8} B{used // N:>6} B/widget")
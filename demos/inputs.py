@@ -31,8 +31,17 @@ GUI.add_widgets((slide, spinbox, show_button))
 
 key_esc = KeyHandler(setup_hardware.BTN_ESCAPE, press=(GUI.key_response, KEY_ESCAPE))
 key_enter = KeyHandler(setup_hardware.BTN_ENTER, press=(GUI.key_response, KEY_MOUSE0))
-key_next = KeyHandler(setup_hardware.BTN_DOWN, press=(GUI.key_response, KEY_DOWN))
-key_prev = KeyHandler(setup_hardware.BTN_UP, press=(GUI.key_response, KEY_UP))
+# 长按时连续调节数值
+key_next = KeyHandler(
+    setup_hardware.BTN_DOWN,
+    press=(GUI.key_response, KEY_DOWN),
+    hold=(GUI.key_response, KEY_DOWN),
+)
+key_prev = KeyHandler(
+    setup_hardware.BTN_UP,
+    press=(GUI.key_response, KEY_UP),
+    hold=(GUI.key_response, KEY_UP),
+)
 
 key_prtsc = KeyHandler(setup_hardware.BTN_PRTSC, press=(GUI.snapshot,))
 GUI.run(key_esc, key_enter, key_next, key_prev, key_prtsc)
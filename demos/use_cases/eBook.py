@@ -3,7 +3,7 @@ from gui import ufont
 from gui.utils.core import *
 from gui.key_handler import KeyHandler
 from gui.xt_gui import XT_GUI
-from gui.widgets.containers import XListView
+from gui.widgets.containers import XVirtualListView
 from gui.widgets.buttons import XButton
 from gui.widgets.base import XLayout, XText
 from gui.widgets.displayers import XPlainTextView
@@ -21,28 +21,39 @@ GUI = XT_GUI(
 
 # 主界面
 GUI.add_widget(XText((0, 0), "eBook", BLUE))
-file_list = XListView((0, 16), (240, 224))
-GUI.add_widget(file_list)
+# 遍历books目录
+books = os.listdir("./resource/books/")
+print(books)
 
 
 # 打开文本
 def open_book(filename):
-    global textview, text
     print("打开文件: " + filename)
-    GUI.add_layer(specified_layout=textview)
+    textview = GUI.add_layer(factory=create_textview)
     with open("./resource/books/" + filename, "r", encoding="UTF-8") as f:
         textview.set_text(f.read())
 
 
-# 遍历books目录
-for book in os.listdir("./resource/books/"):
-    print(book)
-    func = lambda book=book: open_book(book)
-    file_list.add_widget(XButton((0, 0), (0, 16 + 6), func, text=book))
+# 列表只创建可见的行，滚动时复用行控件，书籍数量再多也不会增加内存占用
+def create_item():
+    return XButton((0, 0), (0, 16 + 6))
+
+
+def bind_item(button, index):
+    book = books[index]
+    button.xtext.context = book
+    button.callback = lambda: open_book(book)
+
+
+file_list = XVirtualListView(
+    (0, 16), (240, 224), len(books), create_item, bind_item, 16 + 6
+)
+GUI.add_widget(file_list)
 
 
-# 文本显示区
-textview = XPlainTextView((0, 0), (240, 240))
+# 文本显示区，第一次打开书籍时才创建
+def create_textview():
+    return XPlainTextView((0, 0), (240, 240), page_cache=True)
 
 key_esc = KeyHandler(setup_hardware.BTN_ESCAPE, press=(GUI.key_response, KEY_ESCAPE))
 key_enter = KeyHandler(setup_hardware.BTN_ENTER, press=(GUI.key_response, KEY_MOUSE0))
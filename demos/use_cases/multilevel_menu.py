@@ -13,6 +13,7 @@ GUI = XT_GUI(
     setup_hardware.display,
     ufont.BMFont("./resource/fonts/for_demo/16x16_text_demo.bmf", load_into_mem=True),
     loop_focus=True,
+    layer_snapshot_size=20 * 1024,  # 返回上级菜单时直接恢复画面
 )
 
 key_esc = KeyHandler(setup_hardware.BTN_ESCAPE, press=(GUI.key_response, KEY_ESCAPE))
@@ -22,11 +23,33 @@ key_prev = KeyHandler(setup_hardware.BTN_UP, press=(GUI.key_response, KEY_UP))
 
 
 main = XListView((0, 0), (240, 240))
-sys_setup_menu = XListView((0, 0), (240, 240))
-language_menu = XListView((0, 0), (240, 240))
-
 GUI.add_widget(main)
 
+
+# 子菜单在第一次进入时才创建，返回后保存在图层缓存中
+def create_sys_setup_menu():
+    menu = XListView((0, 0), (240, 240))
+    menu.add_widget(XButton((0, 0), text="Time", callback=lambda: print("Time.")))
+    menu.add_widget(
+        XButton((0, 0), text="Brightness", callback=lambda: print("Brightness."))
+    )
+    menu.add_widget(
+        XButton(
+            (0, 0),
+            text="Language",
+            callback=lambda: GUI.add_layer(factory=create_language_menu),
+        )
+    )
+    return menu
+
+
+def create_language_menu():
+    menu = XListView((0, 0), (240, 240))
+    for i in ["English", "Chinese", "Japanese"]:
+        menu.add_widget(XButton((0, 0), text=i, callback=lambda x=i: print(x)))
+    return menu
+
+
 # 主菜单
 main.add_widget(
     XButton((0, 0), text="Weather", callback=lambda: print("Weather. Just an example."))
@@ -38,26 +61,9 @@ main.add_widget(
     XButton(
         (0, 0),
         text="System setup",
-        callback=lambda: GUI.add_layer(specified_layout=sys_setup_menu),
+        callback=lambda: GUI.add_layer(factory=create_sys_setup_menu),
     )
 )
 
-# 系统设置菜单
-sys_setup_menu.add_widget(XButton((0, 0), text="Time", callback=lambda: print("Time.")))
-sys_setup_menu.add_widget(
-    XButton((0, 0), text="Brightness", callback=lambda: print("Brightness."))
-)
-sys_setup_menu.add_widget(
-    XButton(
-        (0, 0),
-        text="Language",
-        callback=lambda: GUI.add_layer(specified_layout=language_menu),
-    )
-)
-
-# 语言菜单
-for i in ["English", "Chinese", "Japanese"]:
-    language_menu.add_widget(XButton((0, 0), text=i, callback=lambda x=i: print(x)))
-
 key_prtsc = KeyHandler(setup_hardware.BTN_PRTSC, press=(GUI.snapshot,))
 GUI.run(key_esc, key_enter, key_next, key_prev, key_prtsc)
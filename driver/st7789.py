@@ -92,6 +92,7 @@ _ENCODE_PIXEL = ">H"
 _ENCODE_POS = ">HH"
 
 _BUFFER_SIZE = const(256)
+_GDDRAM_ROWS = const(320)
 
 
 def _encode_pos(x, y):
@@ -139,6 +140,7 @@ class ST7789:
 
         self.xstart = xstart
         self.ystart = ystart
+        self._scroll_top = 0  # 硬件滚动区域起始的显存行
 
         self.hard_reset()
         self.soft_reset()
@@ -285,6 +287,31 @@ class ST7789:
         """在当前窗口写入GDDRAM数据"""
         self.write(_ST7789_RAMWR, buffer)
 
+    def write_gddram_rows(self, y, h, buffer):
+        """只写入从第y行开始的h行GDDRAM数据，buffer只包含这些行，完成后恢复全屏窗口"""
+        self.write(
+            _ST7789_RASET, _encode_pos(y + self.ystart, y + h - 1 + self.ystart)
+        )
+        self.write(_ST7789_RAMWR, buffer)
+        self.write(
+            _ST7789_RASET, _encode_pos(0 + self.ystart, self.height - 1 + self.ystart)
+        )
+
+    def set_scroll_area(self, y, h):
+        """设置硬件垂直滚动区域为从第y行开始的h行，只支持竖屏方向，不支持时返回False"""
+        if self._rotation != 0:
+            return False
+        top = y + self.ystart
+        self._scroll_top = top
+        self.write(
+            _ST7789_VSCRDEF, struct.pack(">HHH", top, h, _GDDRAM_ROWS - top - h)
+        )
+        return True
+
+    def set_scroll_start(self, line):
+        """滚动区域顶部显示滚动区域内第line行的GDDRAM数据"""
+        self.write(_ST7789_VSCSAD, struct.pack(">H", self._scroll_top + line))
+
     def clear_gddram(self):
         chunks, rest = divmod(self.width * self.height, _BUFFER_SIZE)
         pixel = _encode_pixel(0)
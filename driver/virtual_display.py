@@ -0,0 +1,56 @@
+"""
+不连接硬件的虚拟屏幕驱动，用于在主机或没有屏幕的开发板上运行、测试GUI。
+
+实现了与ST7789相同的显存写入与硬件垂直滚动接口，
+显存内容保存在gddram中，screen()返回应用滚动偏移后屏幕上实际显示的帧。
+"""
+
+RGB565 = 1  # 与framebuf.RGB565相同，不导入framebuf，主机上的Python也可以使用
+
+
+class VirtualDisplay:
+
+    def __init__(self, width=240, height=240, color_mode=RGB565):
+        if color_mode != RGB565:
+            raise ValueError("Only RGB565 is supported")
+        self.width = width
+        self.height = height
+        self.color_mode = color_mode
+        self._row_len = width * 2
+        self.gddram = bytearray(self._row_len * height)
+        self.rows_written = 0  # 累计写入的行数，用于统计传输量
+        self._scroll_area = (0, 0)
+        self._scroll_start = 0
+
+    def write_gddram(self, buffer):
+        """写入整个显存"""
+        self.gddram[:] = buffer
+        self.rows_written += self.height
+
+    def write_gddram_rows(self, y, h, buffer):
+        """只写入从第y行开始的h行显存数据"""
+        row_len = self._row_len
+        self.gddram[y * row_len : (y + h) * row_len] = buffer
+        self.rows_written += h
+
+    def set_scroll_area(self, y, h):
+        """设置硬件垂直滚动区域为从第y行开始的h行"""
+        self._scroll_area = (y, h)
+        self._scroll_start = 0
+        return True
+
+    def set_scroll_start(self, line):
+        """滚动区域顶部显示滚动区域内第line行的显存数据"""
+        self._scroll_start = line
+
+    def screen(self) -> bytearray:
+        """返回屏幕上实际显示的帧"""
+        frame = bytearray(self.gddram)
+        y, h = self._scroll_area
+        line = self._scroll_start
+        if line:
+            row_len = self._row_len
+            area = self.gddram[y * row_len : (y + h) * row_len]
+            split = line * row_len
+            frame[y * row_len : (y + h) * row_len] = area[split:] + area[:split]
+        return frame
@@ -6,6 +6,8 @@ from .colors import *
 from .key import *
 from .event import *
 
+_SCRATCH_SIZE = const(8192)  # 暂存矩形区域像素的缓冲区字节数，RGB565可以保存64x64像素
+
 
 # 图形界面单例
 class GuiSingle:
@@ -22,6 +24,121 @@ class FrameBufferOffset(framebuf.FrameBuffer):
         self.x_offset = x_offset
 
 
+def framebuf_size(width: int, height: int, color_mode: int) -> int:
+    """计算指定颜色模式的帧缓冲区需要的字节数"""
+    if color_mode == framebuf.RGB565:
+        return width * height * 2
+    elif color_mode in (
+        framebuf.MONO_HLSB,
+        framebuf.MONO_HMSB,
+    ):
+        return ceil(width / 8) * height
+    elif color_mode == framebuf.MONO_VLSB:
+        return ceil(height / 8) * width
+    elif color_mode == framebuf.GS2_HMSB:
+        return ceil(width / 4) * height
+    elif color_mode == framebuf.GS4_HMSB:
+        return ceil(width / 2) * height
+    elif color_mode == framebuf.GS8:
+        return width * height
+    else:
+        raise ValueError("Unsupported color mode")
+
+
+def framebuf_offset(width: int, color_mode: int, x: int, y: int) -> int:
+    """计算宽度为width的帧缓冲区中坐标(x, y)所在的字节偏移"""
+    if color_mode == framebuf.RGB565:
+        return (width * 2 * y) + (x * 2)
+    elif color_mode in (
+        framebuf.MONO_VLSB,
+        framebuf.MONO_HLSB,
+        framebuf.MONO_HMSB,
+    ):
+        return (ceil(width / 8) * y) + (x // 8)
+    elif color_mode == framebuf.GS2_HMSB:
+        return (ceil(width / 4) * y) + (x // 4)
+    elif color_mode == framebuf.GS4_HMSB:
+        return (ceil(width / 2) * y) + (x // 2)
+    elif color_mode == framebuf.GS8:
+        return (width * y) + x
+    else:
+        raise ValueError("Unsupported color mode")
+
+
+def framebuf_slice(buffer, width: int, color_mode: int, x, y, w, h):
+    """从宽度为width的帧缓冲区中截取一个矩形区域，使用memoryview实现，不会占用额外空间。
+
+    Args:
+        buffer: 帧缓冲区
+        width: 帧缓冲区的像素宽
+        color_mode: 帧缓冲区的颜色模式
+        x: x坐标
+        y: y坐标
+        w: 像素宽
+        h: 像素高
+
+    Returns:
+        对应矩形的帧缓冲对象。
+    """
+    byte_offset = framebuf_offset(width, color_mode, x, y)
+    tmp = buffer if isinstance(buffer, memoryview) else memoryview(buffer)
+    if color_mode in (framebuf.RGB565, framebuf.GS8):
+        return framebuf.FrameBuffer(tmp[byte_offset:], w, h, color_mode, width)
+    else:
+        return FrameBufferOffset(
+            tmp[byte_offset:], w, h, color_mode, width, 8 - (x % 8)
+        )
+
+
+class ClipView(framebuf.FrameBuffer):
+    """帧缓冲中一个矩形区域的视图，与帧缓冲共享像素数据
+
+    每个容器只持有一个视图，矩形变化时用set_rect()原地修改，不会创建新的视图对象。
+    """
+
+    clip_rect = None  # 视图在帧缓冲中的矩形(x,y,w,h)
+
+    def __init__(self, display: "DisplayAPI", rect: tuple[int, int, int, int]):
+        self._display = display
+        self.set_rect(rect)
+
+    def set_rect(self, rect: tuple[int, int, int, int]):
+        """修改视图的位置和大小，矩形不变时什么也不做"""
+        if rect == self.clip_rect:
+            return
+        self.clip_rect = rect
+        x, y, w, h = rect
+        display = self._display
+        color_mode = display.color_mode
+        offset = framebuf_offset(display.width, color_mode, x, y)
+        # FrameBuffer只能在初始化时指定缓冲区，重新初始化只更新自己引用的视图
+        super().__init__(display._buffer_view[offset:], w, h, color_mode, display.width)
+
+
+def _common_prefix(a, b, n: int) -> int:
+    """二分查找两个等长内存视图相同前缀的长度，每次只比较新的一段"""
+    lo, hi = 0, n
+    while lo < hi:
+        mid = (lo + hi + 1) >> 1
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix(a, b, n: int) -> int:
+    """二分查找两个等长内存视图相同后缀的长度"""
+    lo, hi = 0, n
+    while lo < hi:
+        mid = (lo + hi + 1) >> 1
+        if a[n - mid : n - lo] == b[n - mid : n - lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
 # 屏幕驱动通用接口
 class DisplayAPI(framebuf.FrameBuffer):
     def __init__(self, display) -> None:
@@ -29,31 +146,193 @@ class DisplayAPI(framebuf.FrameBuffer):
         self.width = display.width
         self.height = display.height
         self.color_mode = color_mode = display.color_mode
-        if color_mode == framebuf.RGB565:
-            self.buffer = bytearray(self.width * self.height * 2)
-        elif color_mode in (
-            framebuf.MONO_HLSB,
-            framebuf.MONO_HMSB,
-        ):
-            self.buffer = bytearray(ceil(self.width / 8) * self.height)
-        elif color_mode == framebuf.MONO_VLSB:
-            self.buffer = bytearray(ceil(self.height / 8) * self.width)
-        elif color_mode == framebuf.GS2_HMSB:
-            self.buffer = bytearray(ceil(self.width / 4) * self.height)
-        elif color_mode == framebuf.GS4_HMSB:
-            self.buffer = bytearray(ceil(self.width / 2) * self.height)
-        elif color_mode == framebuf.GS8:
-            self.buffer = bytearray(self.width * self.height)
-        else:
-            raise ValueError("Unsupported color mode")
+        self.buffer = bytearray(framebuf_size(self.width, self.height, color_mode))
+        self._buffer_view = memoryview(self.buffer)
+        self._scroll_view = None  # scroll_rect()使用的视图，第一次滚动时创建
+        self._scratch = None  # 暂存矩形区域像素的缓冲区，第一次使用时创建
         super().__init__(self.buffer, self.width, self.height, color_mode)
+        self._row_len = framebuf_size(self.width, 1, color_mode)
+        # 需要写入显存的行区间[(起始行, 结束行)]
+        self._dirty_rows: list[tuple[int, int]] = [(0, self.height)]
+        # 硬件垂直滚动区域(起始行, 行数)与滚动偏移
+        self._scroll_area = (0, 0)
+        self._scroll_offset = 0
 
     def clear(self):
         self.fill(0)
         self.update_frame()
 
     def update_frame(self):
-        self.display.write_gddram(self.buffer)
+        """将整个帧写入显存"""
+        self._dirty_rows.clear()
+        if self._scroll_offset:
+            self._write_rows(0, self.height)
+        else:
+            self.display.write_gddram(self.buffer)
+
+    def update_rows(self, y: int, h: int):
+        """只将从第y行开始的h行写入显存，显示器驱动不支持时写入整个帧
+
+        写入的行不再需要在下一次flush时写入。
+        """
+        y_end = min(y + h, self.height)
+        y = max(y, 0)
+        if y >= y_end:
+            return
+        if not hasattr(self.display, "write_gddram_rows"):
+            self.update_frame()
+            return
+        self._write_rows(y, y_end)
+        rows = self._dirty_rows
+        for i in range(len(rows) - 1, -1, -1):
+            begin, end = rows[i]
+            if end <= y or begin >= y_end:
+                continue
+            rows.pop(i)
+            if begin < y:
+                rows.append((begin, y))
+            if end > y_end:
+                rows.append((y_end, end))
+
+    def mark_dirty(self, y: int, h: int):
+        """标记从第y行开始的h行需要在下一次flush时写入显存"""
+        y_end = min(y + h, self.height)
+        y = max(y, 0)
+        if y >= y_end:
+            return
+        rows = self._dirty_rows
+        for i, (begin, end) in enumerate(rows):
+            if y <= end and begin <= y_end:
+                rows[i] = (min(y, begin), max(y_end, end))
+                return
+        rows.append((y, y_end))
+
+    def flush(self):
+        """只将标记过的行写入显存
+
+        没有标记任何行时写入整个帧，直接在DisplayAPI上绘图而没有调用mark_dirty的内容仍然会显示。
+        """
+        rows = self._dirty_rows
+        if not rows or not hasattr(self.display, "write_gddram_rows"):
+            self.update_frame()
+            return
+        rows.sort()
+        begin, end = rows[0]
+        for y, y_end in rows[1:]:
+            if y <= end:
+                end = max(end, y_end)
+            else:
+                self._write_rows(begin, end)
+                begin, end = y, y_end
+        self._write_rows(begin, end)
+        rows.clear()
+
+    def scroll_rows(self, y: int, h: int, dy: int) -> bool:
+        """硬件垂直滚动从第y行开始的h行整行像素，帧缓冲中的像素同样平移dy行
+
+        只需要把新露出的行写入显存。显示器驱动不支持时返回False，不做任何修改。
+        """
+        display = self.display
+        if (
+            not hasattr(display, "set_scroll_area")
+            or not hasattr(display, "write_gddram_rows")
+            or h <= 0
+            or abs(dy) >= h
+        ):
+            return False
+        if self._scroll_area != (y, h):
+            if not display.set_scroll_area(y, h):
+                return False
+            if self._scroll_offset:
+                # 旧滚动区域的显存内容是错位的，需要重新写入
+                self.mark_dirty(*self._scroll_area)
+            self._scroll_area = (y, h)
+            self._scroll_offset = 0
+        self.scroll_rect(0, y, self.width, h, dy)
+        self._scroll_offset = (self._scroll_offset - dy) % h
+        display.set_scroll_start(self._scroll_offset)
+        return True
+
+    def pack_frame(self, out, offset: int = 0) -> int:
+        """把帧缓冲压缩写入out[offset:]，每行只保存与上一行不同的一段
+
+        每行记录为4字节头(起始字节、长度，均为小端16位)加不同的字节，
+        界面中大片相同的背景、边框只需要头部。比较都是C实现的内存比较。
+
+        Returns:
+            写入结束的位置，out空间不足时返回-1
+        """
+        row_len = self._row_len
+        src = memoryview(self.buffer)
+        dst = memoryview(out)
+        capacity = len(out)
+        prev = memoryview(bytes(row_len))  # 第一行与全黑的行比较
+        for begin in range(0, len(self.buffer), row_len):
+            row = src[begin : begin + row_len]
+            if row == prev:
+                first = length = 0
+            else:
+                first = _common_prefix(row, prev, row_len)
+                rest = row_len - first
+                length = rest - _common_suffix(row[first:], prev[first:], rest)
+            end = offset + 4 + length
+            if end > capacity:
+                return -1
+            dst[offset] = first & 0xFF
+            dst[offset + 1] = first >> 8
+            dst[offset + 2] = length & 0xFF
+            dst[offset + 3] = length >> 8
+            dst[offset + 4 : end] = row[first : first + length]
+            offset = end
+            prev = row
+        return offset
+
+    def unpack_frame(self, data, begin: int, end: int):
+        """从data[begin:end]恢复pack_frame保存的帧缓冲，并标记整个屏幕需要写入"""
+        row_len = self._row_len
+        src = memoryview(data)
+        dst = memoryview(self.buffer)
+        prev = bytes(row_len)
+        pos = 0
+        while begin < end:
+            first = src[begin] | (src[begin + 1] << 8)
+            length = src[begin + 2] | (src[begin + 3] << 8)
+            begin += 4
+            row = dst[pos : pos + row_len]
+            if length != row_len:
+                row[:] = prev
+            if length:
+                row[first : first + length] = src[begin : begin + length]
+                begin += length
+            prev = row
+            pos += row_len
+        self.mark_dirty(0, self.height)
+
+    def _write_rows(self, y: int, y_end: int):
+        """写入屏幕上的[y, y_end)行，处于硬件滚动区域的行映射到滚动后的显存行"""
+        write_rows = self.display.write_gddram_rows
+        buffer = memoryview(self.buffer)
+        row_len = self._row_len
+        area_y, area_h = self._scroll_area
+        offset = self._scroll_offset
+        if offset:
+            area_end = area_y + area_h
+            # 滚动区域内，显存行在area_y + area_h - offset处回绕
+            wrap = area_end - offset
+            splits = (area_y, wrap, area_end)
+        else:
+            splits = ()
+        while y < y_end:
+            end = y_end
+            for split in splits:
+                if y < split < end:
+                    end = split
+            if offset and area_y <= y < area_end:
+                gddram_y = area_y + (y - area_y + offset) % area_h
+            else:
+                gddram_y = y
+            write_rows(gddram_y, end - y, buffer[y * row_len : end * row_len])
+            y = end
 
     def framebuf_slice(self, x, y, w, h):
         """帧缓冲切片，使用memoryview实现，不会占用额外空间。
@@ -67,35 +346,57 @@ class DisplayAPI(framebuf.FrameBuffer):
         Returns:
             对应矩形的帧缓冲对象。
         """
-        width = self.width
-        color_mode = self.color_mode
-
-        if color_mode == framebuf.RGB565:
-            byte_offset = (width * 2 * y) + (x * 2)
-        elif color_mode in (
-            framebuf.MONO_VLSB,
-            framebuf.MONO_HLSB,
-            framebuf.MONO_HMSB,
-        ):
-            byte_offset = (ceil(width / 8) * y) + (x // 8)
-        elif color_mode == framebuf.GS2_HMSB:
-            byte_offset = (ceil(width / 4) * y) + (x // 4)
-        elif color_mode == framebuf.GS4_HMSB:
-            byte_offset = (ceil(width / 2) * y) + (x // 2)
-        elif color_mode == framebuf.GS8:
-            byte_offset = (width * y) + x
+        return framebuf_slice(
+            self._buffer_view, self.width, self.color_mode, x, y, w, h
+        )
+
+    def scroll_rect(self, x: int, y: int, w: int, h: int, dy: int):
+        """把矩形区域(x,y,w,h)内的像素平移dy行，所有滚动共用一个视图"""
+        view = self._scroll_view
+        if view is None:
+            view = self._scroll_view = ClipView(self, (x, y, w, h))
         else:
-            raise ValueError("Unsupported color mode")
+            view.set_rect((x, y, w, h))
+        view.scroll(0, dy)
 
-        tmp = memoryview(self.buffer)
-        if color_mode in (framebuf.RGB565, framebuf.GS8):
-            return framebuf.FrameBuffer(tmp[byte_offset:], w, h, self.color_mode, width)
-        else:
-            return FrameBufferOffset(
-                tmp[byte_offset:], w, h, self.color_mode, width, 8 - (x % 8)
+    def save_rects(self, rects):
+        """把多个矩形区域(x,y,w,h)的像素暂存到缓冲区，总大小超过缓冲区时返回None
+
+        Returns:
+            传给restore_rects()恢复像素的对象，下一次暂存前有效
+        """
+        color_mode = self.color_mode
+        total = 0
+        for rect in rects:
+            total += framebuf_size(rect[2], rect[3], color_mode)
+        if total > _SCRATCH_SIZE:
+            return None
+        scratch = self._scratch
+        if scratch is None:
+            scratch = self._scratch = memoryview(bytearray(_SCRATCH_SIZE))
+        saved = []
+        offset = 0
+        for x, y, w, h in rects:
+            size = framebuf_size(w, h, color_mode)
+            frame = framebuf.FrameBuffer(
+                scratch[offset : offset + size], w, h, color_mode
             )
+            frame.blit(self, -x, -y)
+            saved.append((x, y, h, frame))
+            offset += size
+        return saved
+
+    def restore_rects(self, saved):
+        """恢复save_rects()暂存的像素"""
+        for x, y, h, frame in saved:
+            self.blit(frame, x, y)
+            # 绘制期间这些行可能已经写入显存(例如渐进显示的图像)
+            self.mark_dirty(y, h)
 
     # 实现类XLayout透明化
+    _layout_depth = 0
+    _parent = None
+
     @property
     def _layout_wh(self):
         return self.width, self.height
@@ -141,16 +442,22 @@ def read_to_space(buffer: io.BufferedReader | io.BytesIO, begin: int | None = No
     return b""
 
 
-def crc32(data: bytes) -> int:
-    crc = 0xFFFFFFFF
-    for byte in data:
-        crc ^= byte
-        for _ in range(8):
-            if crc & 1:
-                crc = (crc >> 1) ^ 0xEDB88320
-            else:
-                crc >>= 1
-    return (~crc) & 0xFFFFFFFF
+try:
+    # 优先使用固件内置的实现，速度快得多
+    from binascii import crc32
+except ImportError:
+
+    def crc32(data: bytes, crc: int = 0) -> int:
+        """计算CRC32，可以传入上一段数据的结果进行增量计算"""
+        crc ^= 0xFFFFFFFF
+        for byte in data:
+            crc ^= byte
+            for _ in range(8):
+                if crc & 1:
+                    crc = (crc >> 1) ^ 0xEDB88320
+                else:
+                    crc >>= 1
+        return (~crc) & 0xFFFFFFFF
 
 
 def rgb888_to_rgb565(r8: int, g8: int, b8: int, big_endian=False) -> int:
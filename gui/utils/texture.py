@@ -1,13 +1,373 @@
+import asyncio
 import gc
 import io
 import framebuf
-from math import ceil, floor, log2
+from array import array
+from math import ceil, cos, floor, log2, pi, sqrt
 import deflate
-from .core import crc32, read_to_space, rgb888_to_rgb565
+from .core import (
+    crc32,
+    framebuf_size,
+    framebuf_slice,
+    read_to_space,
+    rgb888_to_rgb565,
+)
 
 # 图像格式枚举
 PBM_P4 = const(0)
 PNG = const(1)
+# 原生纹理格式，像素数据就是framebuf的内存布局，无需解码
+XTEX = const(2)
+JPEG = const(3)
+
+XTEX_MAGIC = b"XTEX"
+XTEX_VERSION = const(1)
+# 文件头: 4字节标识 1字节版本 1字节颜色模式 2字节宽 2字节高 2字节调色板颜色数
+XTEX_HEADER_LEN = const(12)
+
+
+class _IDATStream(io.IOBase):
+    """将PNG所有IDAT块的数据呈现为一个连续的流，交给同一个DeflateIO解压。
+
+    直接从文件流读取到解压器的缓冲区，不复制块数据，读取的同时增量校验CRC。
+    """
+
+    def __init__(self, stream: io.BufferedReader | io.BytesIO) -> None:
+        self._stream = stream
+        self._remain = 0  # 当前IDAT块剩余未读取的数据长度
+        self._crc = 0
+        self._end = not self._next_chunk()
+
+    def _next_chunk(self) -> bool:
+        """跳转到下一个IDAT块的数据起始处，遇到IEND返回False"""
+        stream = self._stream
+        while True:
+            chunk_len = int.from_bytes(stream.read(4), "big")
+            chunk_type = stream.read(4)
+            if len(chunk_type) != 4:
+                raise ValueError("IEND not found")
+            if chunk_type == b"IDAT":
+                self._remain = chunk_len
+                self._crc = crc32(chunk_type)
+                return True
+            if chunk_type == b"IEND":
+                return False
+            stream.seek(chunk_len + 4, 1)
+
+    def readinto(self, buf) -> int:
+        stream = self._stream
+        view = memoryview(buf)
+        size = len(buf)
+        n = 0
+        while n < size and not self._end:
+            if self._remain == 0:
+                # 当前块读取完毕，校验CRC后进入下一个块
+                if self._crc.to_bytes(4, "big") != stream.read(4):
+                    raise ValueError("CRC check failed")
+                self._end = not self._next_chunk()
+                continue
+            read_len = stream.readinto(view[n : n + min(self._remain, size - n)])
+            if not read_len:
+                raise ValueError("Unexpected end of file")
+            self._crc = crc32(view[n : n + read_len], self._crc)
+            self._remain -= read_len
+            n += read_len
+        return n
+
+
+def _repack_table(src_depth: int, dst_depth: int, lsb_first: bool) -> bytes:
+    """PNG样本(高位在前)重新打包为framebuf像素格式的查找表
+
+    每个目标字节由 src_depth // dst_depth 个源字节合成，
+    表中第p段(每段256项)为源字节位于第p个时贡献的位。
+
+    Args:
+        lsb_first: 目标格式的第一个像素在字节的低位(GS2_HMSB)
+    """
+    count = src_depth // dst_depth
+    per_byte = 8 // src_depth
+    mask = (1 << dst_depth) - 1
+    table = bytearray(count << 8)
+    for p in range(count):
+        for byte in range(256):
+            packed = 0
+            for i in range(per_byte):
+                sample = (byte >> (8 - src_depth * (i + 1))) & mask
+                j = p * per_byte + i
+                shift = dst_depth * j if lsb_first else 8 - dst_depth * (j + 1)
+                packed |= sample << shift
+            table[(p << 8) | byte] = packed
+    return bytes(table)
+
+
+def _repack_row(src, dst, table: bytes, begin: int, end: int):
+    """使用查找表将src中的样本打包到dst的第begin到end(不包含)个字节"""
+    count = len(table) >> 8
+    if count == 1:
+        for i in range(begin, end):
+            dst[i] = table[src[i]]
+        return
+    # 最后一个目标字节可能只对应部分源字节
+    full_end = min(end, len(src) // count)
+    if count == 2:
+        for i in range(begin, full_end):
+            dst[i] = table[src[i * 2]] | table[256 + src[i * 2 + 1]]
+    else:
+        for i in range(begin, full_end):
+            s = i * count
+            packed = 0
+            for p in range(count):
+                packed |= table[(p << 8) | src[s + p]]
+            dst[i] = packed
+    for i in range(max(begin, full_end), end):
+        s = i * count
+        packed = 0
+        for p in range(len(src) - s):
+            packed |= table[(p << 8) | src[s + p]]
+        dst[i] = packed
+
+
+# JPEG系数的Z字形顺序到8x8块自然顺序(行*8+列)的映射
+_JPEG_ZIGZAG = bytes(
+    (
+        0, 1, 8, 16, 9, 2, 3, 10, 17, 24, 32, 25, 18, 11, 4, 5,
+        12, 19, 26, 33, 40, 48, 41, 34, 27, 20, 13, 6, 7, 14, 21, 28,
+        35, 42, 49, 56, 57, 50, 43, 36, 29, 22, 15, 23, 30, 37, 44, 51,
+        58, 59, 52, 45, 38, 31, 39, 46, 53, 60, 61, 54, 47, 55, 62, 63,
+    )
+)  # fmt: skip
+
+
+def _jpeg_huffman_table(counts, values) -> tuple:
+    """根据DHT段的码长计数与符号值构建哈夫曼解码表
+
+    Returns:
+        (9位快速查找表, 各码长最大码字, 各码长符号偏移, 符号值)
+        快速查找表的项为 码长<<8|符号，为0表示码长超过9位
+    """
+    fast = array("H", bytes(1024))
+    maxcode = [-1] * 17
+    valoffset = [0] * 17
+    code = 0
+    k = 0
+    for length in range(1, 17):
+        n = counts[length - 1]
+        valoffset[length] = k - code
+        if n:
+            maxcode[length] = code + n - 1
+        if length <= 9:
+            fill = 1 << (9 - length)
+            for i in range(n):
+                entry = (length << 8) | values[k + i]
+                begin = (code + i) << (9 - length)
+                for j in range(begin, begin + fill):
+                    fast[j] = entry
+        k += n
+        code = (code + n) << 1
+    return fast, maxcode, valoffset, bytes(values)
+
+
+class _JPEGBitReader:
+    """按位读取JPEG熵编码数据，去除0xFF后的填充字节。
+
+    遇到标记后不再读取数据流，之后只补充0位，由调用者处理标记。
+    """
+
+    def __init__(self, stream: io.BufferedReader | io.BytesIO) -> None:
+        self._stream = stream
+        self._buf = bytearray(256)
+        self._len = 0
+        self._pos = 0
+        self.bits = 0  # 位缓冲区，只有低nbits位有效
+        self.nbits = 0
+        self.marker = 0
+
+    def _read_byte(self) -> int:
+        if self._pos == self._len:
+            self._len = self._stream.readinto(self._buf)
+            self._pos = 0
+            if not self._len:
+                return -1
+        byte = self._buf[self._pos]
+        self._pos += 1
+        return byte
+
+    def _fill(self):
+        """将位缓冲区补充到至少17位"""
+        bits = self.bits & ((1 << self.nbits) - 1)
+        while self.nbits <= 16:
+            byte = 0
+            if not self.marker:
+                byte = self._read_byte()
+                if byte == 0xFF:
+                    marker = self._read_byte()
+                    while marker == 0xFF:
+                        marker = self._read_byte()
+                    if marker:
+                        # 遇到标记(负数表示文件结束)
+                        self.marker = marker
+                        byte = 0
+                elif byte < 0:
+                    self.marker = -1
+                    byte = 0
+            bits = (bits << 8) | byte
+            self.nbits += 8
+        self.bits = bits
+
+    def decode(self, table: tuple) -> int:
+        """解码一个哈夫曼符号"""
+        if self.nbits < 16:
+            self._fill()
+        bits = self.bits
+        nbits = self.nbits
+        entry = table[0][(bits >> (nbits - 9)) & 0x1FF]
+        if entry:
+            self.nbits = nbits - (entry >> 8)
+            return entry & 0xFF
+        maxcode = table[1]
+        for length in range(10, 17):
+            code = (bits >> (nbits - length)) & ((1 << length) - 1)
+            if code <= maxcode[length]:
+                self.nbits = nbits - length
+                return table[3][code + table[2][length]]
+        raise ValueError("Invalid Huffman code")
+
+    def receive(self, size: int) -> int:
+        """读取size位并扩展为有符号数"""
+        if not size:
+            return 0
+        if self.nbits < size:
+            self._fill()
+        nbits = self.nbits - size
+        self.nbits = nbits
+        value = (self.bits >> nbits) & ((1 << size) - 1)
+        if value < 1 << (size - 1):
+            value -= (1 << size) - 1
+        return value
+
+    def restart(self):
+        """在重启间隔处丢弃剩余的位并跳过RSTn标记"""
+        self.bits = self.nbits = 0
+        while not self.marker:
+            byte = self._read_byte()
+            if byte < 0:
+                self.marker = -1
+            elif byte == 0xFF:
+                marker = self._read_byte()
+                while marker == 0xFF:
+                    marker = self._read_byte()
+                self.marker = marker
+        if 0xD0 <= self.marker <= 0xD7:
+            self.marker = 0
+
+
+def _jpeg_idct_table(n: int) -> list[int]:
+    """n点缩小反DCT的系数表(定点数，放大4096倍)
+
+    只使用8x8系数块左上角的nxn个系数，在n点网格上计算反变换，
+    得到的就是将8x8块缩小n/8后的像素。
+    """
+    table = []
+    for x in range(n):
+        for u in range(n):
+            c = 0.5 / sqrt(2) if u == 0 else 0.5
+            table.append(round(c * cos((2 * x + 1) * u * pi / (2 * n)) * 4096))
+    return table
+
+
+def _jpeg_decode_ac(reader: _JPEGBitReader, table: tuple, quant, zigzag, coef) -> int:
+    """解码一个块的交流系数，只反量化并保存输出需要的系数
+
+    Returns:
+        coef中最后一个非零系数的下标
+    """
+    last = 0
+    k = 1
+    while k < 64:
+        rs = reader.decode(table)
+        size = rs & 0x0F
+        if not size:
+            if rs != 0xF0:
+                break  # EOB
+            k += 16
+            continue
+        k += rs >> 4
+        if k > 63:
+            raise ValueError("Invalid JPEG data")
+        value = reader.receive(size)
+        i = zigzag[k]
+        if i != 255:
+            coef[i] = value * quant[k]
+            if i > last:
+                last = i
+        k += 1
+    return last
+
+
+def _jpeg_idct(coef, last, n, table, tmp, plane, offset, stride):
+    """nxn反DCT(可分离的两次一维变换)，结果写入plane的offset处"""
+    if not last:
+        # 只有直流系数，整个块为同一个值
+        value = ((coef[0] + 4) >> 3) + 128
+        value = 0 if value < 0 else 255 if value > 255 else value
+        for y in range(n):
+            o = offset + y * stride
+            for x in range(o, o + n):
+                plane[x] = value
+        return
+    # 只有前rows行存在非零系数
+    rows = last // n + 1
+    for v in range(rows):
+        base = v * n
+        for x in range(n):
+            s = 0
+            t = x * n
+            for u in range(n):
+                s += table[t + u] * coef[base + u]
+            tmp[base + x] = s >> 10
+    for y in range(n):
+        o = offset + y * stride
+        t = y * n
+        for x in range(n):
+            s = 8192
+            for v in range(rows):
+                s += table[t + v] * tmp[v * n + x]
+            value = (s >> 14) + 128
+            plane[o + x] = 0 if value < 0 else 255 if value > 255 else value
+
+
+def _jpeg_color_convert(
+    components, planes, width, y, h_max, v_max, col_begin, col_end, dst, offset
+):
+    """将MCU行中的第y行转换为显示器字节序的RGB565"""
+    h, v = components[0][0], components[0][1]
+    lum = planes[0]
+    lum_row = (y * v // v_max) * width * h
+    if len(components) == 1:
+        for x in range(col_begin, col_end):
+            c = lum[lum_row + x * h // h_max]
+            dst[offset] = (c & 0xF8) | (c >> 5)
+            dst[offset + 1] = ((c << 3) & 0xE0) | (c >> 3)
+            offset += 2
+        return
+
+    ch, cv = components[1][0], components[1][1]
+    cb_plane, cr_plane = planes[1], planes[2]
+    chroma_row = (y * cv // v_max) * width * ch
+    for x in range(col_begin, col_end):
+        lu = lum[lum_row + x * h // h_max]
+        i = chroma_row + x * ch // h_max
+        cb = cb_plane[i] - 128
+        cr = cr_plane[i] - 128
+        r = lu + ((91881 * cr) >> 16)
+        g = lu - ((22554 * cb + 46802 * cr) >> 16)
+        b = lu + ((116130 * cb) >> 16)
+        r = 0 if r < 0 else 255 if r > 255 else r
+        g = 0 if g < 0 else 255 if g > 255 else g
+        b = 0 if b < 0 else 255 if b > 255 else b
+        dst[offset] = (r & 0xF8) | (g >> 5)
+        dst[offset + 1] = ((g << 3) & 0xE0) | (b >> 3)
+        offset += 2
 
 
 class Texture2D:
@@ -17,10 +377,13 @@ class Texture2D:
     常见公开属性:
     w: 宽
     h: 高
+    src_w: 解码器输出的图像宽(解码时缩小图像才与w不同，JPEG在DCT域缩小后的宽)
+    src_h: 解码器输出的图像高
     type: 图像类型，为 TEX_BITMAP (完整点阵图)或 TEX_STREAMING (流式加载)
     palette_used: 使用调色板
-    img_format: 图像格式 PNG JPEG PBM_P4等
+    img_format: 图像格式 PNG JPEG PBM_P4 XTEX等
     color_mode: 颜色模式，用于确定像素的格式，例如framebuf.RGB565
+    ready: 像素数据是否可以绘制(延迟加载的纹理在load()完成前为False)
 
     bitmap_frame: bitmap帧数据 (TEX_BITMAP 类型独有)
     palette: 调色板帧数据 (使用调色板时存在，灰度图像默认不使用)
@@ -29,9 +392,12 @@ class Texture2D:
 
     私有属性:
     __bitmap_buf : 完整点阵图的缓冲区，用于 TEX_BITMAP 类型。
-    __scanline_buf : 一条扫描线的缓冲区, 用于 TEX_STREAMING 类型。
-    __scanline_frame : 一条扫描线的的帧数据, 用于 TEX_STREAMING 类型。
-    __data : 保存二进制数据流, 用于 TEX_STREAMING 类型。
+    __scanline_buf : 原始图像一条扫描线的缓冲区, 用于 TEX_STREAMING 类型或缩小图像。
+    __scanline_frame : 原始图像一条扫描线的的帧数据, 用于 TEX_STREAMING 类型或缩小图像。
+    __row_frame : 缩小后一行的帧数据, 用于缩小图像的 TEX_STREAMING 类型。
+    __col_map : 缩小后每列对应的原始图像列, 不缩小时为None。
+    __row_map : 原始图像每行是否需要解码(缩小时被跳过的行为0), 不缩小时为None。
+    __data : 保存二进制数据流, 用于 TEX_STREAMING 类型或延迟加载的 TEX_BITMAP 类型。
 
     """
 
@@ -48,7 +414,7 @@ class Texture2D:
     def __parse_header(self, stream: io.BufferedReader | io.BytesIO) -> int | None:
         """
         解析文件头->计算辅助信息->记录图像数据的起始位置->
-        确定颜色模式、是否使用调色板->创建完整点整图缓冲区或扫描线缓冲区->
+        确定颜色模式、是否使用调色板
 
         Returns:
             图像格式，为None表示解析失败
@@ -58,25 +424,84 @@ class Texture2D:
             return PBM_P4
         elif self.__parse_header_png(stream) is not None:
             return PNG
+        elif self.__parse_header_xtex(stream) is not None:
+            return XTEX
+        elif self.__parse_header_jpeg(stream) is not None:
+            return JPEG
 
-    def __decode_into_mem(self, img):
-        """每个__decoder_pbm内创建图像缓存，解码图像数据为bitmap到内存"""
+    def __decoder(self, stream, row_begin=0, row_end=None, col_begin=0, col_end=None):
+        """选择对应格式的解码器，参数均为原始图像的坐标。
+
+        row_end为None时将整个图像解码到bitmap缓冲区，
+        否则逐行解码到扫描线缓冲区，两种情况都在每解码一行后产生行号。
+        """
+        stream.seek(self.__start_index)
         img_format = self.img_format
-        if img_format == PBM_P4:
-            for _ in self.__decoder_pbm(img):
-                pass
-        elif img_format == PNG:
-            for _ in self.__decoder_png(img):
-                pass
+        if img_format == PBM_P4 or img_format == XTEX:
+            return self.__decoder_raw(stream, row_begin, row_end)
+        elif img_format == JPEG:
+            return self.__decoder_jpeg(stream, row_begin, row_end, col_begin, col_end)
+        else:
+            return self.__decoder_png(stream, row_begin, row_end, col_begin, col_end)
 
-    def __init__(self, raw_data: bytes | str, bitmap=True) -> None:
+    def __decode_into_mem(self, img):
+        """解码图像数据为bitmap到内存
+
+        Returns:
+            迭代器，每解码一行产生一次
+        """
+        if self.__col_map is None:
+            return self.__decoder(img)
+        return self.__scaled_rows(img, 0, self.h, 0, self.w, self.bitmap_frame, True)
+
+    def __set_scale(self, size: tuple[int, int]):
+        """按比例缩小到不超过size的尺寸，建立行列映射表"""
+        max_w, max_h = size
+        src_w, src_h = self.src_w, self.src_h
+        if src_w <= max_w and src_h <= max_h:
+            return
+        # 保持宽高比
+        if src_w * max_h > src_h * max_w:
+            w, h = max_w, max(1, src_h * max_w // src_w)
+        else:
+            w, h = max(1, src_w * max_h // src_h), max_h
+        self.w, self.h = w, h
+        if self.img_format == JPEG:
+            # 先在DCT域缩小到不小于目标尺寸的最大比例(1/2 1/4 1/8)，剩余部分再最近邻采样
+            shift = 0
+            while shift < 3 and src_w >> (shift + 1) >= w and src_h >> (shift + 1) >= h:
+                shift += 1
+            self.__jpeg_shift = shift
+            src_w = self.src_w = (src_w + (1 << shift) - 1) >> shift
+            src_h = self.src_h = (src_h + (1 << shift) - 1) >> shift
+            if src_w == w and src_h == h:
+                return
+        # 最近邻采样
+        self.__col_map = array("H", (x * src_w // w for x in range(w)))
+        self.__row_map = bytearray(src_h)
+        for y in range(h):
+            self.__row_map[y * src_h // h] = 1
+
+    def __init__(
+        self,
+        raw_data: bytes | str,
+        bitmap=True,
+        size: tuple[int, int] | None = None,
+        lazy=False,
+    ) -> None:
         """
         Args:
             raw_data: 路径或原始数据
             bitmap: 将数据转换为适当的bitmap格式存储在内存中. 如果为False，则保持二进制流，绘制时解码.
+            size: (宽,高)最大尺寸. 超出该尺寸的图像在解码时按比例缩小(最近邻)，只保存缩小后的图像.
+            lazy: 只解析文件头并分配缓冲区，之后由load()在异步任务中解码(仅 TEX_BITMAP 类型).
         """
         gc.collect()
         self.type = Texture2D.TEX_BITMAP if bitmap else Texture2D.TEX_STREAMING
+        # 像素数据是否已经可以绘制
+        self.ready = True
+        self.__loading = False
+        self.error = None  # 延迟加载时解码失败的异常
         self.palette_used = False
         self.color_mode = framebuf.RGB565
 
@@ -92,40 +517,175 @@ class Texture2D:
         if self.img_format is None:
             raise ValueError("Unsupported image format")
 
-        # 创建帧数据
+        # 确定缩小后的尺寸
+        self.src_w, self.src_h = self.w, self.h
+        self.__col_map = None
+        self.__row_map = None
+        if size is not None:
+            self.__set_scale(size)
+
+        # 创建缓冲区与帧数据
+        color_mode = self.color_mode
+        if self.type == Texture2D.TEX_STREAMING or self.__col_map is not None:
+            self.__scanline_buf = bytearray(framebuf_size(self.src_w, 1, color_mode))
+            self.__scanline_frame = framebuf.FrameBuffer(
+                self.__scanline_buf, self.src_w, 1, color_mode
+            )
         if self.type == Texture2D.TEX_BITMAP:
+            self.__bitmap_buf = bytearray(framebuf_size(self.w, self.h, color_mode))
             self.bitmap_frame = framebuf.FrameBuffer(
-                self.__bitmap_buf, self.w, self.h, self.color_mode
+                self.__bitmap_buf, self.w, self.h, color_mode
             )
-        else:
-            self.__scanline_frame = framebuf.FrameBuffer(
-                self.__scanline_buf, self.w, 1, self.color_mode
+        elif self.__col_map is not None:
+            self.__row_frame = framebuf.FrameBuffer(
+                bytearray(framebuf_size(self.w, 1, color_mode)), self.w, 1, color_mode
             )
 
         # 解析图像数据或保持二进制流
         gc.collect()
-        if self.type == Texture2D.TEX_BITMAP:
-            self.__decode_into_mem(img)
+        if self.type == Texture2D.TEX_BITMAP and not lazy:
+            for _ in self.__decode_into_mem(img):
+                pass
         else:
+            self.ready = self.type == Texture2D.TEX_STREAMING
             self.__data = img
             return
         img.close()
 
+    async def load(self, rows_per_slice=16):
+        """解码延迟加载的纹理，每解码rows_per_slice行让出一次事件循环
+
+        解码期间按键扫描与界面刷新可以继续运行，完成后ready为True。
+        解码失败时ready保持为False，异常保存在error中，这次和之后的调用(包括等待同一个纹理的任务)都抛出该异常。
+        """
+        if self.ready:
+            return
+        if self.__loading:
+            # 其他任务正在解码同一个纹理
+            while self.__loading:
+                await asyncio.sleep(0)
+            if self.ready:
+                return
+        if self.error is not None:
+            raise self.error
+        self.__loading = True
+        img = self.__data
+        try:
+            n = 0
+            for _ in self.__decode_into_mem(img):
+                n += 1
+                if n == rows_per_slice:
+                    n = 0
+                    await asyncio.sleep(0)
+            self.ready = True
+        except Exception as e:
+            # 数据流已经被部分读取，不能重新解码
+            self.error = e
+            raise
+        finally:
+            self.__loading = False
+            img.close()
+            del self.__data
+            gc.collect()
+
     def __iter__(self):
         """
         Yields:
             每行的帧数据
         """
+        return self.scanlines()
+
+    def region(self, x: int, y: int, w: int, h: int) -> "TextureRegion":
+        """创建纹理子区域的视图，与纹理共享像素数据 (仅 TEX_BITMAP 类型)
+
+        对于单个字节保存多个像素的颜色模式，x必须对齐到字节边界。
+        """
+        if self.type != Texture2D.TEX_BITMAP:
+            raise TypeError("Only bitmap textures support regions")
+        if x < 0 or y < 0 or w <= 0 or h <= 0 or x + w > self.w or y + h > self.h:
+            raise ValueError("Region out of range")
+        color_mode = self.color_mode
+        if color_mode in (framebuf.MONO_HLSB, framebuf.MONO_HMSB):
+            px_per_byte = 8
+        elif color_mode == framebuf.GS2_HMSB:
+            px_per_byte = 4
+        elif color_mode == framebuf.GS4_HMSB:
+            px_per_byte = 2
+        else:
+            px_per_byte = 1
+        if x % px_per_byte:
+            raise ValueError("Region x must be byte aligned")
+        frame = framebuf_slice(self.__bitmap_buf, self.w, color_mode, x, y, w, h)
+        return TextureRegion(self, frame, w, h)
+
+    def scanlines(self, row_begin=0, row_end=None, col_begin=0, col_end=None):
+        """逐行解码流式纹理，只对可见范围内的像素进行转换。
+
+        可见行之前的行仍需解压(PNG过滤器依赖上一行)但不进行像素转换，
+        到达结束行后立即停止解码。
+
+        Args:
+            row_begin: 起始行(包含)
+            row_end: 结束行(不包含)，默认为图像高度
+            col_begin: 起始列(包含)
+            col_end: 结束列(不包含)，默认为图像宽度
+
+        Yields:
+            从row_begin开始每行的帧数据，可见列之外的像素内容是不确定的
+        """
         if self.type == Texture2D.TEX_BITMAP:
             return
-        color_mode = self.color_mode
-        self.__data.seek(self.__start_index)
-        if self.img_format == PBM_P4:
-            for scanline_data in self.__decoder_pbm():
+        row_end = self.h if row_end is None else min(row_end, self.h)
+        col_end = self.w if col_end is None else min(col_end, self.w)
+        row_begin = max(row_begin, 0)
+        col_begin = max(col_begin, 0)
+        if row_begin >= row_end or col_begin >= col_end:
+            return
+
+        if self.__col_map is None:
+            for _ in self.__decoder(self.__data, row_begin, row_end, col_begin, col_end):
                 yield self.__scanline_frame
-        elif self.img_format == PNG:
-            for scanline_data in self.__decoder_png():
-                yield framebuf.FrameBuffer(scanline_data, self.w, 1, color_mode)
+        else:
+            yield from self.__scaled_rows(
+                self.__data,
+                row_begin,
+                row_end,
+                col_begin,
+                col_end,
+                self.__row_frame,
+                False,
+            )
+
+    def __scaled_rows(
+        self, stream, row_begin, row_end, col_begin, col_end, dst, into_bitmap
+    ):
+        """解码原始图像中被采样的行，缩小到dst中
+
+        Args:
+            dst: 完整的bitmap帧数据或缩小后的一行帧数据
+            into_bitmap: dst为完整的bitmap帧数据时写入对应行，否则总是写入第0行
+
+        Yields:
+            每解码一行缩小后的图像产生一次dst
+        """
+        col_map = self.__col_map
+        src_h = self.src_h
+        h = self.h
+        src = self.__scanline_frame
+        y = row_begin if into_bitmap else 0
+        step = 1 if into_bitmap else 0
+        decoder = self.__decoder(
+            stream,
+            row_begin * src_h // h,
+            (row_end - 1) * src_h // h + 1,
+            col_map[col_begin],
+            col_map[col_end - 1] + 1,
+        )
+        for _ in decoder:
+            for x in range(col_begin, col_end):
+                dst.pixel(x, y, src.pixel(col_map[x], 0))
+            yield dst
+            y += step
 
     # 文件头解析的具体实现
     def __parse_header_pbm(self, img: io.BufferedReader | io.BytesIO) -> int | None:
@@ -141,12 +701,7 @@ class Texture2D:
             self.bitdepth = 1
             self.__start_index = 2 + len(w) + len(h) + 3
 
-            # 确定颜色模式创建缓冲区
             self.color_mode = framebuf.MONO_HLSB
-            if self.type == Texture2D.TEX_BITMAP:
-                self.__bitmap_buf = bytearray(ceil(self.w / 8) * self.h)
-            else:
-                self.__scanline_buf = bytearray(ceil(self.w / 8))
             return PBM_P4
 
     def __parse_header_png(self, img: io.BufferedReader | io.BytesIO) -> int | None:
@@ -239,7 +794,7 @@ class Texture2D:
 
         self.__start_index = 8
 
-        # 确定颜色模式创建缓冲区
+        # 确定颜色模式
         if self.png_type in [Texture2D.PNG_GRAY, Texture2D.PNG_INDEX_COLOR]:
             if self.bitdepth == 1:
                 self.color_mode = framebuf.MONO_HLSB
@@ -249,42 +804,194 @@ class Texture2D:
                 self.color_mode = framebuf.GS4_HMSB
             else:
                 self.color_mode = framebuf.GS8
-            if self.type == Texture2D.TEX_BITMAP:
-                self.__bitmap_buf = bytearray(
-                    ceil(self.w / (8 / self.bitdepth)) * self.h
-                )
-            else:
-                self.__scanline_buf = bytearray(ceil(self.w / (8 / self.bitdepth)))
         else:
             self.color_mode = framebuf.RGB565
-            if self.type == Texture2D.TEX_BITMAP:
-                self.__bitmap_buf = bytearray(self.w * 2 * self.h)
-            else:
-                self.__scanline_buf = bytearray(self.w * 2)
         return PNG
 
+    def __parse_header_xtex(self, img: io.BufferedReader | io.BytesIO) -> int | None:
+        img.seek(0)
+        if img.read(4) != XTEX_MAGIC:
+            return
+
+        header = img.read(XTEX_HEADER_LEN - 4)
+        if len(header) != XTEX_HEADER_LEN - 4:
+            raise ValueError("Invalid XTEX file")
+        if header[0] != XTEX_VERSION:
+            raise TypeError("Unsupported XTEX version")
+
+        # 颜色模式直接保存framebuf中定义的常量
+        color_mode = header[1]
+        if color_mode in (framebuf.MONO_HLSB, framebuf.MONO_HMSB):
+            self.bitdepth = 1
+        elif color_mode == framebuf.GS2_HMSB:
+            self.bitdepth = 2
+        elif color_mode == framebuf.GS4_HMSB:
+            self.bitdepth = 4
+        elif color_mode == framebuf.GS8:
+            self.bitdepth = 8
+        elif color_mode == framebuf.RGB565:
+            self.bitdepth = 16
+        else:
+            raise TypeError("Unsupported color mode")
+        self.color_mode = color_mode
+        self.w = int.from_bytes(header[2:4], "big")
+        self.h = int.from_bytes(header[4:6], "big")
+
+        # 调色板颜色已经是显示器字节序的RGB565
+        color_num = int.from_bytes(header[6:8], "big")
+        if color_num:
+            if color_mode == framebuf.RGB565:
+                raise ValueError("Invalid XTEX palette")
+            self.palette_used = True
+            palette_buf = bytearray(color_num * 2)
+            img.readinto(palette_buf)
+            self.palette = framebuf.FrameBuffer(
+                palette_buf, color_num, 1, framebuf.RGB565
+            )
+        self.__start_index = XTEX_HEADER_LEN + color_num * 2
+        return XTEX
+
     def __parse_header_jpeg(self, stream: io.BufferedReader | io.BytesIO) -> int | None:
         stream.seek(0)
-        pass
+        if stream.read(2) != b"\xFF\xD8":
+            return
+
+        qtables = [None] * 4
+        htables = {}
+        frame = None
+        self.__jpeg_restart = 0
+        while True:
+            marker = stream.read(2)
+            if len(marker) != 2 or marker[0] != 0xFF:
+                raise ValueError("Invalid JPEG file")
+            marker = marker[1]
+            if marker == 0xFF:
+                # 标记前的填充字节
+                stream.seek(-1, 1)
+                continue
+            if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+                continue
+            if marker == 0xD9:
+                raise ValueError("SOS not found")
+            seg_len = int.from_bytes(stream.read(2), "big") - 2
+            if marker not in (0xC0, 0xC1, 0xC4, 0xDA, 0xDB, 0xDD):
+                if 0xC2 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                    # 渐进式、无损、算术编码等
+                    raise TypeError("Only baseline JPEG is supported")
+                stream.seek(seg_len, 1)
+                continue
+
+            data = stream.read(seg_len)
+            if len(data) != seg_len:
+                raise ValueError("Invalid JPEG file")
+            if marker == 0xDB:
+                # 量化表，保持Z字形顺序
+                i = 0
+                while i < seg_len:
+                    if data[i] >> 4:
+                        qtables[data[i] & 0x03] = [
+                            int.from_bytes(data[i + 1 + k * 2 : i + 3 + k * 2], "big")
+                            for k in range(64)
+                        ]
+                        i += 129
+                    else:
+                        qtables[data[i] & 0x03] = list(data[i + 1 : i + 65])
+                        i += 65
+            elif marker == 0xC4:
+                i = 0
+                while i < seg_len:
+                    counts = data[i + 1 : i + 17]
+                    total = sum(counts)
+                    htables[data[i]] = _jpeg_huffman_table(
+                        counts, data[i + 17 : i + 17 + total]
+                    )
+                    i += 17 + total
+            elif marker == 0xDD:
+                self.__jpeg_restart = int.from_bytes(data[0:2], "big")
+            elif marker == 0xC0 or marker == 0xC1:
+                if data[0] != 8:
+                    raise TypeError("Unsupported bitdepth")
+                self.h = int.from_bytes(data[1:3], "big")
+                self.w = int.from_bytes(data[3:5], "big")
+                if data[5] != 1 and data[5] != 3:
+                    raise TypeError("Unsupported JPEG color space")
+                # 分量id -> (水平采样因子, 垂直采样因子, 量化表号)
+                frame = {}
+                for i in range(6, 6 + data[5] * 3, 3):
+                    frame[data[i]] = (data[i + 1] >> 4, data[i + 1] & 0x0F, data[i + 2])
+            else:
+                # SOS，之后就是熵编码数据
+                if frame is None:
+                    raise ValueError("SOF not found")
+                if data[0] != len(frame):
+                    raise TypeError("Non-interleaved JPEG is not supported")
+                # 按扫描中的顺序保存分量: [水平采样因子, 垂直采样因子, 量化表, DC表, AC表]
+                components = []
+                for i in range(1, 1 + data[0] * 2, 2):
+                    h, v, tq = frame[data[i]]
+                    dc = htables.get(data[i + 1] >> 4)
+                    ac = htables.get(0x10 | (data[i + 1] & 0x0F))
+                    if qtables[tq] is None or dc is None or ac is None:
+                        raise ValueError("Missing JPEG table")
+                    components.append((h, v, qtables[tq], dc, ac))
+                if len(components) == 3 and components[1][:2] != components[2][:2]:
+                    raise TypeError("Unsupported chroma subsampling")
+                self.__jpeg_components = components
+                break
+
+        self.__jpeg_w, self.__jpeg_h = self.w, self.h
+        self.__jpeg_shift = 0
+        self.__start_index = stream.tell()
+        self.bitdepth = 8
+        self.color_mode = framebuf.RGB565
+        return JPEG
 
     # 解码器的具体实现
-    def __decoder_pbm(self, stream: io.BufferedReader | io.BytesIO | None = None):
-        if stream is None:
-            stream = self.__data
-            for _ in range(self.h):
-                stream.readinto(self.__scanline_buf)
-                yield self.__scanline_buf
-        else:
-            stream.readinto(self.__bitmap_buf)
+    def __decoder_raw(
+        self,
+        stream: io.BufferedReader | io.BytesIO,
+        row_begin=0,
+        row_end=None,
+    ):
+        if row_end is None:
+            view = memoryview(self.__bitmap_buf)
+            row_len = len(view) // self.h
+            for row in range(self.h):
+                stream.readinto(view[row * row_len : (row + 1) * row_len])
+                yield row
+            return
 
-    def __decoder_png(self, stream: io.BufferedReader | io.BytesIO | None = None):
+        # 每行长度固定，可以直接跳过不需要的行
+        row_map = self.__row_map
+        row_len = len(self.__scanline_buf)
+        skip = row_begin
+        for row in range(row_begin, row_end):
+            if row_map is not None and not row_map[row]:
+                skip += 1
+                continue
+            if skip:
+                stream.seek(skip * row_len, 1)
+                skip = 0
+            stream.readinto(self.__scanline_buf)
+            yield row
+
+    def __decoder_png(
+        self,
+        stream: io.BufferedReader | io.BytesIO,
+        row_begin=0,
+        row_end=None,
+        col_begin=0,
+        col_end=0,
+    ):
         """
         Args:
-            stream: 如果传入IO流，则从流中解码数据到self.data。如果为None，则返回一条行扫描线的数据。
+            stream: 图像数据流
+            row_begin: 逐行解码的起始行，之前的行只解压和解码过滤器
+            row_end: 逐行解码的结束行(不包含)，到达后停止解码. 为None时解码整个图像到bitmap缓冲区
+            col_begin: 逐行解码需要转换像素的起始列
+            col_end: 逐行解码需要转换像素的结束列(不包含)
         """
-        if stream is None:
-            stream = self.__data
-
+        src_w, src_h = self.src_w, self.src_h
         last_scanline = memoryview(bytearray(self.__png_scanline_len))
         scanline = memoryview(bytearray(self.__png_scanline_len))
         if (
@@ -292,189 +999,319 @@ class Texture2D:
             or self.png_type == Texture2D.PNG_INDEX_COLOR
         ):
             predicted_wbits = ceil(
-                log2(ceil(self.w * self.__png_sample_bitdepth / 8) * self.h)
+                log2(ceil(src_w * self.__png_sample_bitdepth / 8) * src_h)
             )
         else:
             predicted_wbits = ceil(
-                log2(ceil(self.w * self.__png_sample_bitdepth * 3 / 8) * self.h)
+                log2(ceil(src_w * self.__png_sample_bitdepth * 3 / 8) * src_h)
             )
 
-        scanline_remain_byte = 0
         data_offset = 0
         row = 0
-        if self.type == Texture2D.TEX_BITMAP:
+        into_mem = row_end is None
+        row_map = self.__row_map
+        if into_mem:
             dataview = memoryview(self.__bitmap_buf)
+            row_end = src_h
         else:
             dataview = memoryview(self.__scanline_buf)
-        while True:
-            chunk_len = int.from_bytes(stream.read(4), "big")
-            chunk_type = stream.read(4)
-            if len(chunk_type) != 4:
-                raise ValueError("IEND not found")
-
-            if chunk_type not in [b"IEND", b"IDAT"]:
-                stream.seek(chunk_len + 4, 1)
-                continue
 
-            # 读取块数据
-            chunk_data = stream.read(chunk_len)
-            chunk_crc = stream.read(4)
-            crc = crc32(chunk_type + chunk_data)
-            if crc.to_bytes(4, "big") != chunk_crc:
-                raise ValueError("CRC check failed")
+        # 部分图像编辑器(例如PS)最低只支持8位的样本色深，实际颜色可能小于8位
+        # 例如8位样本色深，实际颜色数为16(4位)的扫描线: 0x0X 0x0X ...
+        # 样本实际上只有低4位存在数据，需要把两个样本合并成一个字节
+        # 另外PNG的样本总是高位在前，而GS2_HMSB的第一个像素在字节的低位
+        # 这些情况使用查找表逐字节重新打包样本，否则直接复制扫描线
+        sample_bitdepth = self.__png_sample_bitdepth
+        repack_table = None
+        if self.png_type != Texture2D.PNG_TURECOLOR and (
+            sample_bitdepth != self.bitdepth or self.color_mode == framebuf.GS2_HMSB
+        ):
+            repack_table = _repack_table(
+                sample_bitdepth, self.bitdepth, self.color_mode == framebuf.GS2_HMSB
+            )
+        row_len = framebuf_size(src_w, 1, self.color_mode)
+        px_per_byte = 8 // self.bitdepth
 
-            if chunk_type == b"IEND":
-                return
+        def paeth_predictor(a, b, c):
+            p = a + b - c
+            pa = abs(p - a)
+            pb = abs(p - b)
+            pc = abs(p - c)
+            if pa <= pb and pa <= pc:
+                return a
+            elif pb <= pc:
+                return b
+            else:
+                return c
 
-            def paeth_predictor(a, b, c):
-                p = a + b - c
-                pa = abs(p - a)
-                pb = abs(p - b)
-                pc = abs(p - c)
-                if pa <= pb and pa <= pc:
-                    return a
-                elif pb <= pc:
-                    return b
-                else:
-                    return c
-
-            # 解码: 解压->从解压数据中读取一条完整的扫描线数据->解码过滤器->解码像素数据
-            with io.BytesIO(chunk_data) as c_data, deflate.DeflateIO(
-                c_data, deflate.ZLIB, predicted_wbits
-            ) as d:
-                gc.collect()
-                # print(micropython.mem_info(1))
-                while True:
-                    if scanline_remain_byte == 0:
-                        filter = d.read(1)
-                        if len(filter) == 1:
-                            scanline_remain_byte = self.__png_scanline_len
-                        else:
-                            break
-                    # 读取扫描线样本
+        # 解码: 从连续的IDAT数据流解压->读取一条完整的扫描线数据->解码过滤器->解码像素数据
+        with deflate.DeflateIO(
+            _IDATStream(stream), deflate.ZLIB, predicted_wbits
+        ) as d:
+            while row < row_end:
+                filter = d.read(1)
+                if len(filter) != 1:
+                    raise ValueError("Incomplete image data")
+                # 读取扫描线样本
+                scanline_remain_byte = self.__png_scanline_len
+                while scanline_remain_byte:
                     n = d.readinto(scanline[-scanline_remain_byte:])
+                    if not n:
+                        raise ValueError("Incomplete image data")
                     scanline_remain_byte -= n
 
-                    if scanline_remain_byte != 0:
-                        break
-
-                    # 解码过滤器
-                    if filter == b"\x01":
-                        # 差分
-                        for x in range(self.__png_scanline_len):
-                            a = x - self.__png_bpp
-                            raw_bpp = 0 if a < 0 else scanline[a]
-                            scanline[x] = (scanline[x] + raw_bpp) % 256
-                    elif filter == b"\x02":
-                        # 向上差分
-                        for x in range(self.__png_scanline_len):
-                            prior = last_scanline[x]
-                            scanline[x] = (scanline[x] + prior) % 256
-                    elif filter == b"\x03":
-                        # 平均
-                        for x in range(self.__png_scanline_len):
-                            a = x - self.__png_bpp
-                            raw_bpp = 0 if a < 0 else scanline[a]
-                            prior = last_scanline[x]
-                            scanline[x] = (
-                                scanline[x] + floor((raw_bpp + prior) / 2)
-                            ) % 256
-                    elif filter == b"\x04":
-                        # 样条差分
-                        for x in range(self.__png_scanline_len):
-                            a = x - self.__png_bpp
-                            raw_bpp = 0 if a < 0 else scanline[a]
-                            prior = last_scanline[x]
-                            prior_bpp = 0 if a < 0 else last_scanline[a]
-                            scanline[x] = (
-                                scanline[x] + paeth_predictor(raw_bpp, prior, prior_bpp)
-                            ) % 256
-                    last_scanline[:] = scanline
-
-                    # 解码行像素数据
-                    if self.type == Texture2D.TEX_BITMAP:
-                        if self.png_type == Texture2D.PNG_GRAY:
-                            dataview[
-                                data_offset : data_offset + self.__png_scanline_len
-                            ] = scanline
-                            data_offset += self.__png_scanline_len
-                        elif self.png_type == Texture2D.PNG_TURECOLOR:
-                            for x in range(0, self.__png_scanline_len, 3):
-                                px = rgb888_to_rgb565(
-                                    scanline[x],
-                                    scanline[x + 1],
-                                    scanline[x + 2],
-                                ).to_bytes(2, "big")
-                                dataview[data_offset : data_offset + 2] = px
-                                data_offset += 2
-                        else:
-                            # 部分图像编辑器(例如PS)最低只支持8位的样本色深，实际颜色可能小于8位
-                            # PNG标准允许1、2、4位的样本色深
-
-                            # 8位样本色深，实际颜色数为16(4位)的扫描线: 0x0X 0x0X ...
-                            # 样本实际上只有低4位存在数据需要把两个样本合并成一个字节
-
-                            # 4位样本色深，实际颜色数为4(2位)的扫描线: 0b00XX_00XX 0b00XX_00XX ...
-                            # 样本实际上只有5，4，1，0位存在数据需要把四个样本合并成一个字节
-
-                            # 当样本色深与颜色数不匹配时，样本之间存在空白位，否则样本之间是紧凑的
-
-                            # 对于存在空白位的情况，根据扫描线挨个读取字节，从字节提取样本，将样本紧凑化，
-                            # 如果使用了framebuf.FrameBuffer，可以使用pixel()直接设置每一个像素为样本
-                            # 也可以构造一个调色板然后使用blit()转换
-                            if self.bitdepth == self.__png_sample_bitdepth:
-                                dataview[
-                                    data_offset : data_offset + self.__png_scanline_len
-                                ] = scanline
-                                data_offset += self.__png_scanline_len
-                            else:
-                                col = 0
-                                sample_per_byte = 8 // self.__png_sample_bitdepth
-                                for byte_data in scanline:
-                                    # 读取字节
-                                    mask = 0xFF
-                                    for i in range(1, sample_per_byte + 1):
-                                        # 从字节提取样本
-                                        shift = 8 - (self.__png_sample_bitdepth * (i))
-                                        self.bitmap_frame.pixel(
-                                            col, row, (byte_data & mask) >> shift
-                                        )
-                                        col += 1
-                                        mask >>= self.__png_sample_bitdepth
-                                        if col == self.w:
-                                            break
-                                row += 1
+                # 解码过滤器
+                if filter == b"\x01":
+                    # 差分
+                    for x in range(self.__png_scanline_len):
+                        a = x - self.__png_bpp
+                        raw_bpp = 0 if a < 0 else scanline[a]
+                        scanline[x] = (scanline[x] + raw_bpp) % 256
+                elif filter == b"\x02":
+                    # 向上差分
+                    for x in range(self.__png_scanline_len):
+                        prior = last_scanline[x]
+                        scanline[x] = (scanline[x] + prior) % 256
+                elif filter == b"\x03":
+                    # 平均
+                    for x in range(self.__png_scanline_len):
+                        a = x - self.__png_bpp
+                        raw_bpp = 0 if a < 0 else scanline[a]
+                        prior = last_scanline[x]
+                        scanline[x] = (
+                            scanline[x] + floor((raw_bpp + prior) / 2)
+                        ) % 256
+                elif filter == b"\x04":
+                    # 样条差分
+                    for x in range(self.__png_scanline_len):
+                        a = x - self.__png_bpp
+                        raw_bpp = 0 if a < 0 else scanline[a]
+                        prior = last_scanline[x]
+                        prior_bpp = 0 if a < 0 else last_scanline[a]
+                        scanline[x] = (
+                            scanline[x] + paeth_predictor(raw_bpp, prior, prior_bpp)
+                        ) % 256
+                last_scanline[:] = scanline
+
+                # 解码行像素数据
+                if into_mem:
+                    if repack_table is not None:
+                        _repack_row(
+                            scanline, dataview[data_offset:], repack_table, 0, row_len
+                        )
+                        data_offset += row_len
+                    elif self.png_type == Texture2D.PNG_TURECOLOR:
+                        for x in range(0, self.__png_scanline_len, 3):
+                            px = rgb888_to_rgb565(
+                                scanline[x],
+                                scanline[x + 1],
+                                scanline[x + 2],
+                            ).to_bytes(2, "big")
+                            dataview[data_offset : data_offset + 2] = px
+                            data_offset += 2
+                    else:
+                        dataview[
+                            data_offset : data_offset + self.__png_scanline_len
+                        ] = scanline
+                        data_offset += self.__png_scanline_len
+                    row += 1
+                    yield row - 1
+                else:
+                    row += 1
+                    # 可见行之前的行与缩小时未被采样的行不转换像素
+                    if row <= row_begin or (row_map is not None and not row_map[row - 1]):
+                        continue
+                    if repack_table is not None:
+                        _repack_row(
+                            scanline,
+                            dataview,
+                            repack_table,
+                            col_begin // px_per_byte,
+                            (col_end - 1) // px_per_byte + 1,
+                        )
+                    elif self.png_type == Texture2D.PNG_TURECOLOR:
+                        data_offset = col_begin * 2
+                        for x in range(col_begin * 3, col_end * 3, 3):
+                            px = rgb888_to_rgb565(
+                                scanline[x],
+                                scanline[x + 1],
+                                scanline[x + 2],
+                            ).to_bytes(2, "big")
+                            dataview[data_offset : data_offset + 2] = px
+                            data_offset += 2
                     else:
-                        if self.png_type == Texture2D.PNG_GRAY:
-                            yield scanline
-                        elif self.png_type == Texture2D.PNG_TURECOLOR:
-                            data_offset = 0
-                            for x in range(0, self.__png_scanline_len, 3):
-                                px = rgb888_to_rgb565(
-                                    scanline[x],
-                                    scanline[x + 1],
-                                    scanline[x + 2],
-                                ).to_bytes(2, "big")
-                                dataview[data_offset : data_offset + 2] = px
-                                data_offset += 2
-                            yield self.__scanline_buf
-                        else:
-                            col = 0
-                            sample_per_byte = 8 // self.__png_sample_bitdepth
-                            for byte_data in scanline:
-                                # 读取字节
-                                mask = 0xFF
-                                for i in range(1, sample_per_byte + 1):
-                                    # 从字节提取样本
-                                    shift = 8 - (self.__png_sample_bitdepth * (i))
-                                    self.__scanline_frame.pixel(
-                                        col, 0, (byte_data & mask) >> shift
-                                    )
-                                    col += 1
-                                    mask >>= self.__png_sample_bitdepth
-                                    if col == self.w:
-                                        break
-                            yield self.__scanline_buf
+                        dataview[:] = scanline
+                    yield row - 1
+
+    def __decoder_jpeg(
+        self,
+        stream: io.BufferedReader | io.BytesIO,
+        row_begin=0,
+        row_end=None,
+        col_begin=0,
+        col_end=0,
+    ):
+        """
+        逐个MCU行解码，参数含义同PNG解码器。
+        不包含可见像素的MCU仍需熵解码(直流系数是差分编码的)，但跳过反DCT与颜色转换。
+        缩小1/2、1/4、1/8时只对左上角的系数做更小的反DCT。
+        """
+        src_w, src_h = self.src_w, self.src_h
+        components = self.__jpeg_components
+        n = 8 >> self.__jpeg_shift
+        h_max = max(c[0] for c in components)
+        v_max = max(c[1] for c in components)
+        mcu_w, mcu_h = h_max * n, v_max * n
+        mcu_cols = (self.__jpeg_w + h_max * 8 - 1) // (h_max * 8)
+        mcu_rows = (self.__jpeg_h + v_max * 8 - 1) // (v_max * 8)
+
+        into_mem = row_end is None
+        if into_mem:
+            dst = self.__bitmap_buf
+            row_end, col_end = src_h, src_w
+        else:
+            dst = self.__scanline_buf
+        row_map = self.__row_map
+        mcu_col_begin = col_begin // mcu_w
+        mcu_col_end = (col_end - 1) // mcu_w + 1
+
+        # Z字形顺序 -> nxn块内的下标，不需要的系数为255
+        zigzag = bytes(
+            (z >> 3) * n + (z & 7) if (z >> 3) < n and (z & 7) < n else 255
+            for z in _JPEG_ZIGZAG
+        )
+        table = _jpeg_idct_table(n)
+        coef = [0] * (n * n)
+        tmp = [0] * (n * n)
+        # 每个分量一个MCU行的样本
+        planes = [bytearray(mcu_cols * c[0] * n * c[1] * n) for c in components]
+        pred = [0] * len(components)
+        reader = _JPEGBitReader(stream)
+        restart = self.__jpeg_restart
+        restart_todo = restart
+
+        for mcu_y in range(mcu_rows):
+            y0 = mcu_y * mcu_h
+            if y0 >= row_end:
+                return
+            y_begin = max(y0, row_begin)
+            y_end = min(y0 + mcu_h, row_end)
+            visible = y_begin < y_end
+            if visible and row_map is not None:
+                visible = any(row_map[y_begin:y_end])
+
+            for mcu_x in range(mcu_cols):
+                if restart:
+                    if not restart_todo:
+                        reader.restart()
+                        for i in range(len(pred)):
+                            pred[i] = 0
+                        restart_todo = restart
+                    restart_todo -= 1
+                idct = visible and mcu_col_begin <= mcu_x < mcu_col_end
+                for ci in range(len(components)):
+                    h, v, quant, dc_table, ac_table = components[ci]
+                    plane = planes[ci]
+                    stride = mcu_cols * h * n
+                    for by in range(v):
+                        for bx in range(h):
+                            pred[ci] += reader.receive(reader.decode(dc_table))
+                            coef[0] = pred[ci] * quant[0]
+                            last = _jpeg_decode_ac(
+                                reader, ac_table, quant, zigzag, coef
+                            )
+                            if idct:
+                                _jpeg_idct(
+                                    coef, last, n, table, tmp, plane,
+                                    by * n * stride + (mcu_x * h + bx) * n, stride,
+                                )  # fmt: skip
+                            for i in range(last + 1):
+                                coef[i] = 0
+
+            if not visible:
+                continue
+            # 颜色转换，色度分量使用最近邻上采样
+            for y in range(y_begin, y_end):
+                if row_map is not None and not row_map[y]:
+                    continue
+                offset = y * src_w * 2 if into_mem else col_begin * 2
+                _jpeg_color_convert(
+                    components, planes, mcu_cols * n, y - y0,
+                    h_max, v_max, col_begin, col_end, dst, offset,
+                )  # fmt: skip
+                yield y
+
+
+class TextureRegion:
+    """纹理子区域视图，可以代替Texture2D传入XImage。
+
+    bitmap_frame是纹理帧缓冲区的切片，不复制像素数据。
+    """
+
+    def __init__(self, texture: Texture2D, frame: framebuf.FrameBuffer, w, h) -> None:
+        self.texture = texture
+        self.bitmap_frame = frame
+        self.w = w
+        self.h = h
+        self.type = Texture2D.TEX_BITMAP
+        self.img_format = texture.img_format
+        self.color_mode = texture.color_mode
+        self.bitdepth = texture.bitdepth
+        self.palette_used = texture.palette_used
+        if texture.palette_used:
+            self.palette = texture.palette
+
+
+class TextureAtlas:
+    """纹理图集: 一张纹理包含多个精灵图，整个图集只打开一次文件、解码一次。
+
+    通过名称获取精灵图的子区域视图，支持MONO、GSx与RGB565的颜色模式。
+    """
+
+    def __init__(
+        self,
+        raw_data: bytes | str,
+        regions: dict[str, tuple[int, int, int, int]] | str,
+        size: tuple[int, int] | None = None,
+    ) -> None:
+        """
+        Args:
+            raw_data: 图集图像的路径或原始数据
+            regions: 精灵图描述 {名称: (x, y, w, h)}，或描述文件的路径
+            size: 传递给Texture2D的最大尺寸，缩小后区域坐标需要对应缩小后的图像
+        """
+        self.texture = Texture2D(raw_data, True, size)
+        if isinstance(regions, str):
+            regions = TextureAtlas.load_regions(regions)
+        self._regions = regions
+        self._views: dict[str, TextureRegion] = {}  # 已经创建的视图
+
+    @staticmethod
+    def load_regions(path: str) -> dict[str, tuple[int, int, int, int]]:
+        """读取描述文件，每行一个精灵图: 名称 x y w h，#开头的行为注释"""
+        regions = {}
+        with open(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line[0] == "#":
+                    continue
+                name, x, y, w, h = line.split()
+                regions[name] = (int(x), int(y), int(w), int(h))
+        return regions
+
+    def names(self):
+        return self._regions.keys()
+
+    def get(self, name: str) -> TextureRegion:
+        """获取精灵图的子区域视图，相同名称共享同一个视图"""
+        view = self._views.get(name)
+        if view is None:
+            view = self.texture.region(*self._regions[name])
+            self._views[name] = view
+        return view
+
+    def __getitem__(self, name: str) -> TextureRegion:
+        return self.get(name)
 
 
 gc.collect()
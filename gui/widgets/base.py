@@ -11,8 +11,16 @@ class XWidget:
 
     变换/父控件更新 -> 触发更新(重新计算一些信息)
 
+    状态的默认值定义为类属性，实例只保存与默认值不同的属性。
+    MicroPython会忽略__slots__，每个实例属性都占用实例属性表的空间。
+
     """
 
+    _parent: "XLayout" = None  # type: ignore # 父控件
+    _redraw_flag: bool = True  # 重绘标记
+    _abs_pos: tuple[int, int] | None = None  # 绝对坐标缓存
+    _desired_wh: tuple[int, int] | None = None  # 测量结果缓存
+
     def __init__(self, pos: tuple[int, int], wh: tuple[int, int], color=BLACK):
         """初始化控件
 
@@ -24,14 +32,13 @@ class XWidget:
         self._pos = pos
         self._wh = wh
         self._color = color
-        self._parent: XLayout = None  # type: ignore # 父控件
-        self._redraw_flag: bool = True  # 重绘标记
 
     # 公共方法
     def set_parent(self, parent: "XLayout"):
         if self._parent != parent:
             self._parent = parent
-            self._redraw_flag = True
+            self._request_redraw()
+            self._invalidate_abs_pos()
 
     def set_pos(self, pos: tuple[int, int]):
         """不可重写"""
@@ -60,21 +67,64 @@ class XWidget:
     def set_color(self, color: int):
         if self._color != color:
             self._color = color
-            self._redraw_flag = True
+            self._request_redraw()
 
     def get_absolute_pos(self) -> tuple[int, int]:
-        """获取绝对位置(不可重写)"""
-        if self._parent is None:
-            return self._pos
-        x, y = self._pos
-        p_x, p_y = self._parent.get_absolute_pos()
-        layout_x, layout_y = self._parent._layout_pos
-        return (x + p_x + layout_x, y + p_y + layout_y)
+        """获取绝对位置(不可重写)
+
+        结果会被缓存，直到自己或祖先的位置、父控件、容器相对坐标发生变化。
+        """
+        abs_pos = self._abs_pos
+        if abs_pos is None:
+            if self._parent is None:
+                abs_pos = self._pos
+            else:
+                x, y = self._pos
+                p_x, p_y = self._parent.get_absolute_pos()
+                layout_x, layout_y = self._parent._layout_pos
+                abs_pos = (x + p_x + layout_x, y + p_y + layout_y)
+            self._abs_pos = abs_pos
+        return abs_pos
+
+    def measure(self) -> tuple[int, int]:
+        """测量期望宽高，结果缓存到内容变化"""
+        desired = self._desired_wh
+        if desired is None:
+            desired = self._measure()
+            if desired is None:
+                # 大小不由内容决定，期望宽高就是当前宽高
+                return self._wh
+            self._desired_wh = desired
+        return desired
+
+    def invalidate_measure(self):
+        """内容变化导致期望宽高变化，清除测量缓存并通知父容器重新排列"""
+        self._desired_wh = None
+        parent = self._parent
+        if isinstance(parent, XLayout):
+            parent._child_measure_changed(self)
+
+    def _measure(self) -> tuple[int, int] | None:
+        """计算期望宽高，由内容决定大小的控件重写，返回None时使用当前宽高"""
+        return None
+
+    def _invalidate_abs_pos(self):
+        """使绝对坐标缓存失效"""
+        self._abs_pos = None
+
+    def _request_redraw(self):
+        """设置重绘标记，并标记所有祖先容器有需要绘制的子孙控件"""
+        self._redraw_flag = True
+        parent = self._parent
+        while parent is not None:
+            parent._subtree_dirty = True
+            parent = parent._parent
 
     # 事件触发器
     def _transfer_event_trigger(self):
         """变换事件触发器"""
-        self._redraw_flag = True
+        self._request_redraw()
+        self._invalidate_abs_pos()
         if self._parent is not None:
             self._parent._event_receiver(TRANSFER_EVENT)
         # print("触发变换事件")  # Debug
@@ -102,30 +152,53 @@ class XWidget:
 
     def _rebuild_draw_area_event_handler(self):
         """重建绘制区域事件处理器(必须继承并执行)"""
-        self._redraw_flag = True
+        self._request_redraw()
         # print("收到重建事件", self)  # Debug
 
     def _clear_draw_area_event_handler(self):
         """擦除绘制区域事件处理器(必须继承并执行)"""
-        self._redraw_flag = True
+        self._request_redraw()
         # print("收到擦除事件", self)  # Debug
 
     # 绘制相关
     def _draw__(self):
         """透明化调用绘制(不可重写)"""
         self._redraw_flag = False
+        self._mark_dirty()
         self._draw()
 
+    def _mark_dirty(self):
+        """标记绘制时会修改的屏幕行，刷新帧时只写入这些行"""
+        if GuiSingle.GUI_SINGLE is not None:
+            y = self.get_absolute_pos()[1]
+            GuiSingle.GUI_SINGLE.display.mark_dirty(y, self._wh[1])
+
     def _draw(self):
         """绘制"""
         x, y = self._pos
         w, h = self._wh
         self._parent._draw_area.rect(x, y, w, h, self._color, True)
 
+    def _opaque_bounds(self) -> tuple[int, int, int, int] | None:
+        """绘制时完全覆盖的矩形(x,y,w,h)，坐标与_pos相同，没有时返回None
+
+        被上方不透明控件完全覆盖的控件不会被绘制。默认只有使用实心矩形绘制的控件是不透明的，
+        重写_draw()后能完全覆盖某个矩形时可以重写这个方法。
+        """
+        if type(self)._draw is XWidget._draw:
+            return self._pos + self._wh
+        return None
+
 
 class XCtrl(XWidget):
     """允许响应按键输入的控件基类"""
 
+    # 光标或焦点是否到达此控件
+    # TODO 进入之后是否应该清除焦点？XFrameLayout会自己清除。其他类是否应该由父控件清除？
+    _focused: bool = False  # 焦点是否位于该控件
+    _enter: bool = False  # 是否进入到控件
+    _key_input = None
+
     def __init__(self, pos, wh, color=WHITE, key_input=None):
         """
         Args:
@@ -137,11 +210,8 @@ class XCtrl(XWidget):
                     返回一个ENTER，指示上层容器需要进入到该控件。
         """
         super().__init__(pos, wh, color)
-        # 光标或焦点是否到达此控件
-        # TODO 进入之后是否应该清除焦点？XFrameLayout会自己清除。其他类是否应该由父控件清除？
-        self._focused: bool = False  # 焦点是否位于该控件
-        self._enter: bool = False  # 是否进入到控件
-        self._key_input = key_input
+        if key_input is not None:
+            self._key_input = key_input
 
     @property
     def focused(self):
@@ -151,7 +221,7 @@ class XCtrl(XWidget):
     def focused(self, val: bool):
         if self._focused != val:
             self._focused = val
-            self._redraw_flag = True
+            self._request_redraw()
 
 
 class XLayout(XCtrl):
@@ -161,58 +231,152 @@ class XLayout(XCtrl):
 
     添加子控件 -> 添加控件到列表 -> 对所有子控件进行调整布局
 
+    布局事务(begin_layout/commit_layout)期间，调整布局、擦除与子容器重建绘制区域
+    只被记录，提交时各执行一次。
+
+    调整布局按子控件的期望宽高(measure())一次算出所有子控件的位置和大小并在一个事务中应用，
+    期望宽高被缓存，只有子控件内容变化时才重新测量并重新排列。
+    只是移动容器、容器宽高不变时，已经排列好的子控件布局仍然有效，不重新调整布局。
+
     """
 
+    _cleared = True  # 已擦除标志
+    _subtree_dirty = True  # 有需要绘制的子孙控件，为False时传递绘制直接返回
+    _layout_wh: tuple[int, int] = (0, 0)  # 容器宽高
+    _layout_pos = (0, 0)  # 容器相对坐标
+    # 绘制区域在屏幕上的矩形(x,y,w,h)，绘制区域无效时为None
+    _clip_rect: tuple[int, int, int, int] | None = None
+    _clip_view: ClipView | None = None  # 绘制区域的视图，第一次绘制时创建
+    # 布局事务
+    _layout_depth = 0  # 嵌套深度
+    _adjust_pending = False  # 提交时调整布局
+    _clear_pending = False  # 提交时擦除
+    _arranged_wh: tuple[int, int] | None = None  # 上次调整布局时的容器宽高
+    # 提交时重建绘制区域的子容器，没有时为空元组，避免每个容器都创建空列表
+    _rebuild_pending: "list[XLayout] | tuple" = ()
+
     def __init__(self, pos, wh, color=WHITE, key_input=None):
         super().__init__(pos, wh, color, key_input)
         self._children: list[XWidget] = []  # 子控件列表
-        self._cleared = True  # 已擦除标志
-        self._layout_wh: tuple[int, int] = (0, 0)  # 容器宽高
-        self._layout_pos = (0, 0)  # 容器相对坐标
 
     # 公共方法
     def set_parent(self, parent: "XLayout"):
         super().set_parent(parent)
-        self._rebuild_draw_area()
-        self._redraw_flag = True
+        if parent is not None:
+            self._request_rebuild()
+        self._request_redraw()
+
+    def begin_layout(self):
+        """开始布局事务，可以嵌套，最外层的commit_layout提交"""
+        self._layout_depth += 1
+
+    def commit_layout(self):
+        """提交布局事务: 调整一次布局、擦除一次，每个变换过的子容器只重建一次绘制区域"""
+        if self._layout_depth > 1:
+            self._layout_depth -= 1
+            return
+        if self._adjust_pending:
+            # 调整布局时仍处于事务中，子控件的变换继续被记录
+            self._adjust_pending = False
+            self._arranged_wh = self._layout_wh
+            self._adjust_layout()
+        self._layout_depth = 0
+        if self._clear_pending:
+            self._clear_pending = False
+            if not self._cleared:
+                self.clear()
+        pending = self._rebuild_pending
+        if pending:
+            self._rebuild_pending = ()
+            for child in pending:
+                # 事务期间可能已经被移除
+                if child._parent is self:
+                    child._rebuild_draw_area()
 
     def clear(self):
         """擦除(不可重写)"""
         if self._layout_wh != (0, 0):
             self._draw_area.fill(0)
+            self._mark_dirty_rows(0, self._layout_wh[1])
             self._cleared = True
             self._clear_draw_area_event_trigger()
 
     def add_widget(self, widget: XWidget):
         """添加子控件并调整布局(必须实现这个参数的版本)"""
+        self.begin_layout()
         self._add_widget(widget)
-        self._adjust_layout()
+        self._adjust_pending = True
+        self.commit_layout()
 
     def add_widgets(self, widgets: list[XWidget] | tuple[XWidget, ...]):
         """添加多个子控件并调整布局(必须实现这个参数的版本,避免多余调整布局的性能问题)"""
+        self.begin_layout()
         for widget in widgets:
             self._add_widget(widget)
-        self._adjust_layout()
+        self._adjust_pending = True
+        self.commit_layout()
 
     def remove_widget(self, widget: XWidget):
         """移除子控件并调整布局(必须实现这个参数的版本)"""
         if widget in self._children:
-            self._children.pop(self._children.index(widget))
+            self._remove_widget(widget)
             widget.set_parent(None)  # type: ignore
             self.clear()
+            self._request_adjust()
+
+    def _mark_dirty_rows(self, y: int, h: int):
+        """标记绘制区域中从第y行开始的h行需要写入显存"""
+        clip = self._clip_rect
+        if clip is not None:
+            GuiSingle.GUI_SINGLE.display.mark_dirty(clip[1] + y, h)  # type: ignore
+
+    # 布局事务
+    def _request_adjust(self):
+        """调整布局，事务期间推迟到提交时"""
+        if self._layout_depth:
+            self._adjust_pending = True
+        else:
+            self._arranged_wh = self._layout_wh
             self._adjust_layout()
 
+    def _child_measure_changed(self, child: XWidget):
+        """子控件期望宽高变化，不排列子控件的容器直接使用期望宽高"""
+        child.set_wh(child.measure())
+
+    def _request_rebuild(self):
+        """重建绘制区域，父容器处于事务期间时推迟到父容器提交时"""
+        parent = self._parent
+        if parent._layout_depth:
+            pending = parent._rebuild_pending
+            if not pending:
+                parent._rebuild_pending = [self]
+            elif self not in pending:
+                pending.append(self)  # type: ignore
+        else:
+            self._rebuild_draw_area()
+
+    def _invalidate_abs_pos(self):
+        # 子控件有缓存时自己一定也有缓存，没有缓存时不需要继续传递
+        if self._abs_pos is not None:
+            self._abs_pos = None
+            for child in self._children:
+                child._invalidate_abs_pos()
+
     # 事件触发器
     def _transfer_event_trigger(self):
         super()._transfer_event_trigger()
         if self._parent is not None:
-            self._rebuild_draw_area()
+            self._request_rebuild()
 
     def _rebuild_draw_area_event_trigger(self):
         """重建容器绘制区域事件触发器"""
+        self.begin_layout()
         for child in self._children:
             child._event_receiver(REBUILD_DRAW_AREA_EVENT)
-        self._adjust_layout()
+        # 容器宽高不变时子控件的相对布局仍然有效
+        if self._arranged_wh != self._layout_wh:
+            self._adjust_pending = True
+        self.commit_layout()
 
     def _clear_draw_area_event_trigger(self):
         """擦除容器绘制区域事件触发器"""
@@ -222,14 +386,15 @@ class XLayout(XCtrl):
     # 事件处理器
     def _transfer_event_handler(self):
         super()._transfer_event_handler()
-        if not self._cleared:
+        if self._layout_depth:
+            self._clear_pending = True
+        elif not self._cleared:
             self.clear()
 
     def _rebuild_draw_area_event_handler(self):
+        # 子控件会在重建时收到事件
         super()._rebuild_draw_area_event_handler()
-        self._rebuild_draw_area()
-        for child in self._children:
-            child._event_receiver(REBUILD_DRAW_AREA_EVENT)
+        self._request_rebuild()
 
     def _clear_draw_area_event_handler(self):
         super()._clear_draw_area_event_handler()
@@ -251,8 +416,7 @@ class XLayout(XCtrl):
             return
 
         if self._parent._layout_wh == (0, 0):
-            self._layout_wh = (0, 0)
-            self._rebuild_draw_area_event_trigger()
+            self._invalidate_draw_area()
             return
 
         # 重写_calc_draw_area()函数即可
@@ -261,8 +425,7 @@ class XLayout(XCtrl):
         # 内部限位
         x_max, y_max = self._wh
         if x_offset < 0 or y_offset < 0 or x_offset >= x_max or y_offset >= y_max:
-            self._layout_wh = (0, 0)
-            self._rebuild_draw_area_event_trigger()
+            self._invalidate_draw_area()
             return
 
         # 父容器限位
@@ -271,8 +434,7 @@ class XLayout(XCtrl):
         y += y_offset
         x_max, y_max = self._parent._layout_wh
         if x >= x_max or y >= y_max or w + x < 0 or y + h < 0:
-            self._layout_wh = (0, 0)
-            self._rebuild_draw_area_event_trigger()
+            self._invalidate_draw_area()
             return
         if x < 0:
             x_offset = -self._pos[0]
@@ -282,17 +444,44 @@ class XLayout(XCtrl):
         h = min(y + h, h, y_max - y, y_max)
 
         # 重建绘制区域
-        self._layout_pos = (x_offset, y_offset)
+        if self._layout_pos != (x_offset, y_offset):
+            self._layout_pos = (x_offset, y_offset)
+            # 子控件的绝对坐标依赖容器相对坐标
+            for child in self._children:
+                child._invalidate_abs_pos()
         self._layout_wh = (w, h)
         display = GuiSingle.GUI_SINGLE.display
         if isinstance(display, DisplayAPI):
             x, y = self.get_absolute_pos()
-            # 容器绘制区域(容器区域)
-            self._draw_area = display.framebuf_slice(x + x_offset, y + y_offset, w, h)
+            # 容器绘制区域(容器区域)，视图在使用时才移动到这个矩形
+            self._clip_rect = (x + x_offset, y + y_offset, w, h)
             self._rebuild_draw_area_event_trigger()
         else:
             raise TypeError("display must be DisplayAPI")
 
+    @property
+    def _draw_area(self) -> ClipView:
+        """绘制区域
+
+        只移动过的容器在下一次绘制时才更新视图，滚动时没有重绘的子容器不会创建内存视图。
+        """
+        view = self._clip_view
+        rect = self._clip_rect
+        if view is None:
+            view = self._clip_view = ClipView(GuiSingle.GUI_SINGLE.display, rect)  # type: ignore
+        elif rect is not None:
+            view.set_rect(rect)
+        return view
+
+    def _invalidate_draw_area(self):
+        """绘制区域无效(超出父容器等)，已经无效时不再通知子控件"""
+        if self._clip_rect is None and self._arranged_wh == (0, 0):
+            # 例如平滑滚动时一直处于可见区域以外的子容器
+            return
+        self._layout_wh = (0, 0)
+        self._clip_rect = None
+        self._rebuild_draw_area_event_trigger()
+
     def _adjust_layout(self):
         """调整布局"""
         pass
@@ -302,34 +491,161 @@ class XLayout(XCtrl):
         self._children.append(widget)
         widget.set_parent(self)
 
+    def _remove_widget(self, widget: XWidget):
+        """从子控件列表移除控件，不修改父控件"""
+        self._children.pop(self._children.index(widget))
+
     def _draw(self):
         pass
 
-    def _draw_deliver(self):
-        """传递绘制(不可重写)"""
+    def _draw_deliver(self, occluders=()):
+        """传递绘制(不可重写)
+
+        只进入有需要绘制的子孙控件的子容器，耗时与需要重绘的控件数量有关，与控件树大小无关。
+
+        Args:
+            occluders: 绘制在这个容器上方的不透明控件[(控件, 屏幕上的不透明矩形)]
+        """
         if self._redraw_flag:
-            self._draw__()
+            if not occluders:
+                self._draw__()
+            elif not _draw_occluded(self, occluders):
+                # 整个容器都被覆盖，子孙控件保留重绘标记
+                return
+        elif not self._subtree_dirty:
+            return
+        # 子控件绘制期间重新设置的标记留到下一帧
+        self._subtree_dirty = False
         # 绘制区域无效时不绘制所有子控件
         if self._layout_wh == (0, 0):
             return
 
         self._cleared = False
         x_max, y_max = self._layout_wh
+        # 不透明子控件的序号和(控件, 屏幕上的不透明矩形)，第一次需要绘制子控件时才收集
+        local_index = None
+        local = None
+        above = occluders  # 当前子控件上方的不透明控件
+        k = 0  # 排在当前子控件后面的第一个不透明子控件在local中的位置
+        above_k = 0  # above对应的k
+        index = -1
         for child in self._children:
+            index += 1
             # 超出容器不绘制
             x, y = child._pos
             if x >= x_max or y >= y_max:
                 continue
 
-            if isinstance(child, XLayout):
-                child._draw_deliver()
-            elif child._redraw_flag:
+            layout = isinstance(child, XLayout)
+            if layout:
+                if not (child._subtree_dirty or child._redraw_flag):
+                    continue
+            elif not child._redraw_flag:
+                continue
+            if local_index is None:
+                local_index, local = self._collect_occluders()
+                if local_index:
+                    above = local if not occluders else occluders + local  # type: ignore
+            if local_index:
+                # 排在当前子控件后面(绘制在它上方)的不透明兄弟控件
+                while k < len(local_index) and local_index[k] <= index:
+                    k += 1
+                if k != above_k:
+                    above_k = k
+                    above = local[k:]  # type: ignore
+                    if occluders:
+                        above = occluders + above  # type: ignore
+            if layout:
+                child._draw_deliver(above)
+            elif not above:
                 child._draw__()
+            else:
+                _draw_occluded(child, above)
+
+    def _collect_occluders(self) -> tuple:
+        """收集不透明子控件的序号和(控件, 屏幕上的不透明矩形)，没有时返回两个空元组"""
+        indices = ()
+        occluders = ()
+        children = self._children
+        for i in range(len(children)):
+            child = children[i]
+            bounds = child._opaque_bounds()
+            if bounds is not None:
+                rect = _screen_rect(child, bounds)
+                if rect is not None:
+                    if not indices:
+                        indices = []
+                        occluders = []
+                    indices.append(i)  # type: ignore
+                    occluders.append((child, rect))  # type: ignore
+        return indices, occluders
+
+
+def _screen_rect(widget: XWidget, rect) -> tuple[int, int, int, int] | None:
+    """把父容器绘制区域中的矩形(x,y,w,h)转换为屏幕坐标并裁剪到父容器的绘制区域，完全被裁剪时返回None"""
+    clip = widget._parent._clip_rect
+    if clip is None:
+        return None
+    cx, cy, cw, ch = clip
+    x, y, w, h = rect
+    x += cx
+    y += cy
+    x0 = max(x, cx)
+    y0 = max(y, cy)
+    x1 = min(x + w, cx + cw)
+    y1 = min(y + h, cy + ch)
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return (x0, y0, x1 - x0, y1 - y0)
+
+
+def _draw_occluded(widget: XWidget, occluders) -> bool:
+    """绘制上方有不透明控件的控件，返回是否绘制
+
+    完全被覆盖时不绘制并保留重绘标记，遮挡控件移开时容器会被擦除，所有子控件都会重绘。
+    部分被覆盖时暂存重叠区域的像素，绘制后恢复，遮挡控件不需要重绘。
+    """
+    rect = _screen_rect(widget, widget._pos + widget._wh)
+    if rect is None:
+        widget._draw__()
+        return True
+    x, y, w, h = rect
+    overlaps = None
+    for occluder in occluders:
+        ox, oy, ow, oh = occluder[1]
+        if ox <= x and oy <= y and x + w <= ox + ow and y + h <= oy + oh:
+            return False
+        x0 = max(x, ox)
+        y0 = max(y, oy)
+        x1 = min(x + w, ox + ow)
+        y1 = min(y + h, oy + oh)
+        if x0 < x1 and y0 < y1:
+            if overlaps is None:
+                overlaps = []
+            overlaps.append((occluder[0], (x0, y0, x1 - x0, y1 - y0)))
+    if overlaps is None:
+        widget._draw__()
+        return True
+    display = GuiSingle.GUI_SINGLE.display  # type: ignore
+    saved = display.save_rects([overlap[1] for overlap in overlaps])
+    widget._draw__()
+    if saved is not None:
+        display.restore_rects(saved)
+    else:
+        # 暂存缓冲区放不下，重绘被画到的遮挡控件
+        for occluder, _ in overlaps:
+            if not occluder._redraw_flag:
+                occluder._event_receiver(CLEAR_DRAW_AREA_EVENT)
+    return True
 
 
 class XFrameLayout(XLayout):
     """拥有基础布局的容器基类，也是GUI的顶层容器。"""
 
+    _focus_index = 0  # 当前焦点
+    _background_color: int | None = None  # 背景颜色，为None时背景透明
+    _background_drawn = False  # 已填充背景
+
     def __init__(
         self,
         pos,
@@ -337,18 +653,21 @@ class XFrameLayout(XLayout):
         loop_focus=True,
         frame=False,
         color=WHITE,
+        background_color=None,
     ):
         """
         Args:
             loop_focus: 是否循环切换焦点.
             frame: 是否绘制边框.
             color: 边框颜色.
+            background_color: 背景颜色，设置后容器不透明，被它完全覆盖的兄弟控件不会被绘制.
             top: 设置为顶层
         """
         super().__init__(pos, wh, color, self._key_response)
+        if background_color is not None:
+            self._background_color = background_color
         # 焦点控件
         self._focus_list: list[XCtrl] = []  # 焦点列表
-        self._focus_index = 0  # 当前焦点
         self._loop_focus = loop_focus  # 允许循环切换焦点
         self._frame = frame  # 有边框
 
@@ -360,15 +679,43 @@ class XFrameLayout(XLayout):
             return (0, 0), (w, h)
 
     def _draw(self):
+        x, y = self._pos
+        w, h = self._wh
+        layout = self._parent._draw_area
+        if self._background_color is not None and not self._background_drawn:
+            # 背景覆盖了子控件，子控件都需要重绘
+            layout.rect(x, y, w, h, self._background_color, True)
+            self._background_drawn = True
+            super()._clear_draw_area_event_trigger()
         if self._frame:
-            x, y = self._pos
-            w, h = self._wh
             # 边框和焦点轮廓
-            layout = self._parent._draw_area
             border_color = FOCUSED_COLOR if self.focused else self._color
             layout.rect(x, y, w, h, border_color)
             layout.rect(x + 1, y + 1, w - 2, h - 2, border_color)
 
+    def _opaque_bounds(self) -> tuple[int, int, int, int] | None:
+        if self._background_color is None:
+            return None
+        return self._pos + self._wh
+
+    def _invalidate_background(self):
+        """背景被擦除或绘制区域变化，下次绘制时重新填充"""
+        if self._background_color is not None:
+            self._background_drawn = False
+            self._request_redraw()
+
+    def _clear_draw_area_event_trigger(self):
+        self._invalidate_background()
+        super()._clear_draw_area_event_trigger()
+
+    def _rebuild_draw_area_event_handler(self):
+        self._invalidate_background()
+        super()._rebuild_draw_area_event_handler()
+
+    def _clear_draw_area_event_handler(self):
+        self._invalidate_background()
+        super()._clear_draw_area_event_handler()
+
     def _add_widget(self, widget: XWidget):
         """添加控件"""
         super()._add_widget(widget)
@@ -378,6 +725,19 @@ class XFrameLayout(XLayout):
             if self._enter and len(self._focus_list) == 1:
                 self._focus_list[self._focus_index].focused = True
 
+    def _remove_widget(self, widget: XWidget):
+        super()._remove_widget(widget)
+        focus_list = self._focus_list
+        if widget in focus_list:
+            index = focus_list.index(widget)
+            focus_list.pop(index)
+            widget.focused = False  # type: ignore
+            # 保持焦点所在的控件不变，移除的是焦点控件时焦点移到前一个
+            if index <= self._focus_index:
+                self._focus_index = max(self._focus_index - 1, 0)
+            if self._enter and focus_list:
+                focus_list[self._focus_index].focused = True
+
     def _key_response(self, key: int):
         """处理按键响应
 
@@ -430,15 +790,20 @@ class XFrameLayout(XLayout):
 
 class XText(XWidget):
 
+    # 多行滚动条位置，起始为0，向下为正，建议只在翻页容器使用
+    _scrollbar_pos = 0
+    # 屏幕上显示的(内容, 行索引)，只为使用过update_context的控件记录，擦除后为None
+    _shown: tuple[str, tuple[int, ...]] | None = None
+    _content_only = False  # 待绘制的变化只有update_context修改的内容
+
     def __init__(self, pos, context: str, color=WHITE, autowrap=True, font_size=None):
         super().__init__(pos, (0, 0), color)
         self._context = context  # 内容
         self._autowrap = autowrap  # 是否自动换行
         # 字体大小（目前无用）
         self._font_size = font_size if font_size is not None else GuiSingle.GUI_SINGLE.font.font_size  # type: ignore
-        self._lines_index: list[int] = []  # 文本预处理结果(每行起始位置在内容中的索引)
-        # 多行滚动条位置，起始为0，向下为正，建议只在翻页容器使用
-        self._scrollbar_pos = 0
+        # 文本预处理结果(每行起始位置在内容中的索引)，与文本测量缓存共享，不能修改
+        self._lines_index: tuple[int, ...] = ()
 
     @property
     def context(self):
@@ -448,24 +813,76 @@ class XText(XWidget):
     def context(self, context: str):
         self._context = context
         self._text_pre_processing()
-        self._redraw_flag = True
+        self._request_redraw()
+        self.invalidate_measure()
 
     # 公共方法
     def set_parent(self, parent: XLayout):
         super().set_parent(parent)
         self._text_pre_processing()
 
-    def _draw(self):
-        if GuiSingle.GUI_SINGLE is not None:
-            GuiSingle.GUI_SINGLE.draw_text(self)
+    def update_context(self, context: str):
+        """修改内容，绘制时只擦除并重绘变化的字，不需要擦除容器
+
+        适合数值、时钟等频繁变化且只有少数字变化的文本。换行结构变化时擦除旧文本后完整重绘。
+        """
+        if context == self._context:
+            return
+        if self._shown is None and not self._redraw_flag:
+            # 屏幕上是当前内容
+            self._shown = (self._context, self._lines_index)
+        content_only = self._content_only or not self._redraw_flag
+        self._context = context
+        self._text_pre_processing()
+        self._request_redraw()
+        self._content_only = content_only
+        self.invalidate_measure()
+
+    def _request_redraw(self):
+        # 其他原因的重绘需要完整绘制
+        self._content_only = False
+        super()._request_redraw()
 
     def _rebuild_draw_area_event_handler(self):
         super()._rebuild_draw_area_event_handler()
+        if self._shown is not None:
+            self._shown = None
         self._text_pre_processing()
 
+    def _clear_draw_area_event_handler(self):
+        super()._clear_draw_area_event_handler()
+        if self._shown is not None:
+            self._shown = None
+
+    def _draw(self):
+        gui = GuiSingle.GUI_SINGLE
+        if gui is not None:
+            shown = self._shown
+            if self._content_only and shown is not None:
+                gui.draw_text_diff(self, shown[0], shown[1])
+            else:
+                if shown is not None and shown[0] != self._context:
+                    # 容器没有被擦除，屏幕上还是旧内容
+                    gui.erase_text(self, len(shown[1]) - 1)
+                gui.draw_text(self)
+            if shown is not None:
+                self._content_only = False
+                self._shown = (self._context, self._lines_index)
+
+    def _mark_dirty(self):
+        # 差异重绘时自己标记修改过的行
+        if self._content_only and self._shown is not None:
+            return
+        # 宽高是整个容器，只标记有文字的行
+        if GuiSingle.GUI_SINGLE is not None:
+            y = self.get_absolute_pos()[1]
+            lines = len(self._lines_index) - 1
+            h = lines * self._font_size - self._scrollbar_pos
+            GuiSingle.GUI_SINGLE.display.mark_dirty(y, min(h, self._wh[1]))
+
     def _set_scrollbar_pos(self, pos: int):
         self._scrollbar_pos = pos
-        self._redraw_flag = True
+        self._request_redraw()
 
     def _text_pre_processing(self):
         if self._parent:
@@ -476,32 +893,11 @@ class XText(XWidget):
             # print("超出容器，不绘制", x, y, w, h)  # Debug
             return
 
-        # 预处理文本，计算出每行文本的起始索引和y坐标
-        _lines_index = self._lines_index
-        _lines_index.clear()
-        _lines_index.append(0)
-        initial_x = x
-
-        font_size = self._font_size
-        half_size = font_size >> 1
-        autowarp = self._autowrap
-        for i, char in enumerate(self._context):
-            # 对特殊字符的处理优化
-            if ord(char) < 0x20 and char != "\n":
-                continue
-
-            # 自动换行
-            if autowarp and x + font_size > w:
-                _lines_index.append(i)
-                x = initial_x
-
-            if char == "\n":
-                x = w
-                continue
-
-            x += half_size if ord(char) <= 0x7F else font_size
-        _lines_index.append(len(self._context))
-        # print("更新，行索引", _lines_index)
+        # 预处理文本，计算出每行文本的起始索引
+        self._lines_index = GuiSingle.GUI_SINGLE.measure_text(  # type: ignore
+            self._context, self._font_size, w - x if self._autowrap else None
+        )[2]
+        # print("更新，行索引", self._lines_index)
 
 
 gc.collect()
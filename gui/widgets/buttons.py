@@ -11,19 +11,32 @@ class XButton(XLayout):
         """按钮控件初始化
 
         Args:
-            wh: 宽高，如果为None则根据text与text_size自动调整
+            wh: 宽高，如果为None则根据text与text_size自动调整，文字变化时重新调整
             callback: 按下回调函数.
         """
-        if wh is None:
-            wh = (
-                text_size * len(text) + 6,
-                text_size + 6,
-            )
-        super().__init__(pos, wh, color, self._press)
+        self._auto_size = wh is None
+        self._text_size = text_size
+        super().__init__(pos, (0, 0) if wh is None else wh, color, self._press)
         self.xtext = XText((0, 0), text, self._color)  # 显示的文字控件
+        if wh is None:
+            self._wh = self.measure()
         self.callback = callback
         self.add_widget(self.xtext)
 
+    def _measure(self) -> tuple[int, int] | None:
+        if not self._auto_size:
+            return None
+        text_size = self._text_size
+        width, lines, _ = GuiSingle.GUI_SINGLE.measure_text(  # type: ignore
+            self.xtext._context, text_size
+        )
+        return width + 6, lines * text_size + 6
+
+    def _child_measure_changed(self, child: XWidget):
+        # 文字变化时自动调整大小的按钮需要重新测量
+        if self._auto_size:
+            self.invalidate_measure()
+
     def _calc_draw_area(self) -> tuple[tuple[int, int], tuple[int, int]]:
         w, h = self._wh
         return (3, 3), (w - 6, h - 6)
@@ -48,6 +61,8 @@ class XRadio(XLayout):
     """单选框"""
 
     unable_to_enter = True  # 控件不可进入
+    _checked = False  # 被选中
+    _group = None  # 组别(目前无用)
 
     def __init__(self, pos, wh, size, text="", color=RED) -> None:
         """
@@ -60,9 +75,7 @@ class XRadio(XLayout):
 
         super().__init__(pos, wh, color, self._check)
         self.xtext = XText((0, 0), text, self._color)
-        self._checked = False  # 被选中
         self._size = size
-        self._group = None  # 组别(目前无用)
         self.add_widget(self.xtext)
 
     @property
@@ -73,7 +86,7 @@ class XRadio(XLayout):
     def checked(self, val):
         if self._checked != val:
             self._checked = val
-            self._redraw_flag = True
+            self._request_redraw()
 
     @property
     def group(self):
@@ -113,7 +126,7 @@ class XRadio(XLayout):
         if KEY_ID == KEY_MOUSE0:
             if self._group is None:
                 self.checked = not self._checked
-                self._redraw_flag = True
+                self._request_redraw()
             elif not self._checked:
                 for radio in self._group:
                     radio.checked = False
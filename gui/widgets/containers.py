@@ -1,46 +1,352 @@
+import asyncio
+from array import array
 from gui.utils.core import WHITE
 from .base import *
 
 
+def _collect_redraw(widget: XWidget, out: list):
+    """收集控件树中带有重绘标记的控件"""
+    if widget._redraw_flag:
+        out.append(widget)
+    if isinstance(widget, XLayout):
+        for child in widget._children:
+            _collect_redraw(child, out)
+
+
+def _reset_redraw(widget: XWidget):
+    """清除控件树的重绘标记"""
+    widget._redraw_flag = False
+    if isinstance(widget, XLayout):
+        for child in widget._children:
+            _reset_redraw(child)
+
+
+def _scroll_rows(layout: XLayout, y: int, h: int, dy: int, whole_rows: bool):
+    """把容器绘制区域中从第y行开始的h行像素平移dy行
+
+    Args:
+        whole_rows: 这些行在绘制区域以外的部分可以跟着平移，可以使用屏幕的硬件滚动
+    """
+    x, clip_y, w, _ = layout._clip_rect  # type: ignore
+    display = GuiSingle.GUI_SINGLE.display  # type: ignore
+    if not (whole_rows and display.scroll_rows(clip_y + y, h, dy)):
+        display.scroll_rect(x, clip_y + y, w, h, dy)
+        layout._mark_dirty_rows(y, h)
+
+
+def _erase_rows(layout: XFrameLayout, y: int, h: int):
+    """用容器的背景颜色擦除绘制区域中从第y行开始的h行"""
+    color = layout._background_color
+    layout._draw_area.fill_rect(
+        0, y, layout._layout_wh[0], h, 0 if color is None else color
+    )
+    layout._mark_dirty_rows(y, h)
+
+
 class XListView(XFrameLayout):
     """列表视图"""
 
     # FIXME 如果是元素超出容器左上边界，元素内文字会从起始点绘制，而不是预期的显示出裁剪后右下部分
 
-    def __init__(self, pos, wh, color=WHITE) -> None:
+    # 起始绘制的y轴位置(第一个子项的y轴偏移、滚动条偏移)
+    _start_offset = 0
+    _scroll_pending = 0  # 尚未完成的平滑滚动距离
+    _scrolling = False  # 平滑滚动任务正在运行
+
+    def __init__(
+        self, pos, wh, color=WHITE, smooth_scroll=False, scroll_step=0
+    ) -> None:
         """
         Args:
             color: 边框颜色.
+            smooth_scroll: 平滑滚动，平移已绘制的像素，只重绘新露出的区域.
+            scroll_step: 平滑滚动每帧滚动的像素数，为0时一帧内完成滚动.
         """
         super().__init__(pos, wh, False, True, color)
-        # 起始绘制的y轴位置(第一个子项的y轴偏移、滚动条偏移)
-        self._start_offset = 0
+        self._smooth_scroll = smooth_scroll
+        self._scroll_step = scroll_step
 
     def _adjust_layout(self) -> None:
         offset = 0
         start = self._start_offset
+        self.begin_layout()
         for child in self._children:
             w = self._layout_wh[0]
-            h = child._wh[1]
+            h = child.measure()[1]
             child.set_transfer((0, start + offset), (w, h))
             offset += h
+        self.commit_layout()
+
+    def _child_measure_changed(self, child: XWidget):
+        self._request_adjust()
+
+    async def __scroll_task(self):
+        """每帧滚动scroll_step个像素，直到完成滚动"""
+        step = self._scroll_step
+        while self._scroll_pending:
+            pending = self._scroll_pending
+            dy = max(-step, min(step, pending))
+            self._scroll_pending = pending - dy
+            self._scroll_pixels(dy)
+            # 等待主循环绘制这一帧
+            await asyncio.sleep(0)
+        self._scrolling = False
+
+    def _scroll_pixels(self, dy: int):
+        """平移已绘制的像素和子控件，只重绘新露出的条带"""
+        self._start_offset += dy
+        w, h = self._layout_wh
+        if h == 0 or abs(dy) >= h or self._cleared:
+            # 没有可以复用的像素
+            self._adjust_layout()
+            return
+
+        display = GuiSingle.GUI_SINGLE.display  # type: ignore
+        # 占满屏幕宽度时左右只有竖直的边框，可以使用屏幕的硬件滚动，只传输新露出的行
+        _scroll_rows(
+            self,
+            0,
+            h,
+            dy,
+            self.get_absolute_pos()[0] == 0 and self._wh[0] == display.width,
+        )
+        top = 0 if dy > 0 else h + dy
+        bottom = top + abs(dy)
+        _erase_rows(self, top, bottom - top)
+        children = self._children
+        dirty = []  # 滚动前就需要的重绘
+        for child in children:
+            _collect_redraw(child, dirty)
+        self.begin_layout()
+        for child in children:
+            x, y = child._pos
+            child.set_pos((x, y + dy))
+        # 像素已经平移到位，不需要擦除整个容器
+        self._clear_pending = False
+        self.commit_layout()
+        for child in children:
+            y = child._pos[1]
+            child_h = child._wh[1]
+            clipped = y - dy < 0 or y - dy + child_h > h
+            exposed = y < bottom and y + child_h > top
+            if y < h and y + child_h > 0 and (clipped or exposed):
+                # 新露出的子控件，以及滚动前被裁剪、像素不完整的子控件
+                y_begin = max(y, 0)
+                _erase_rows(self, y_begin, min(y + child_h, h) - y_begin)
+                child._event_receiver(CLEAR_DRAW_AREA_EVENT)
+            else:
+                _reset_redraw(child)
+        for widget in dirty:
+            widget._request_redraw()
 
     def _key_response(self, key: int):
         ret_val = super()._key_response(key)
         if key in [KEY_UP, KEY_DOWN] and self._focus_list:
             focus = self._focus_list[self._focus_index]
-            y = focus._pos[1]
+            # 平滑滚动未完成时按滚动结束后的位置计算
+            y = focus._pos[1] + self._scroll_pending
             h = focus._wh[1]
+            layout_h = self._layout_wh[1]
             # 焦点超出滚动区域，调整起始绘制偏移到合适的位置
             if y < 0:
-                self._start_offset -= y
-                self._adjust_layout()
-            elif y + h > self._layout_wh[1]:
-                self._start_offset -= y + h - self._layout_wh[1]
+                dy = -y
+            elif y + h > layout_h:
+                dy = layout_h - y - h
+            else:
+                return ret_val
+            if not self._smooth_scroll:
+                self._start_offset += dy
                 self._adjust_layout()
+            elif not self._scroll_step:
+                self._scroll_pixels(dy)
+            else:
+                self._scroll_pending += dy
+                if not self._scrolling:
+                    self._scrolling = True
+                    asyncio.create_task(self.__scroll_task())
         return ret_val
 
 
+class XVirtualListView(XFrameLayout):
+    """虚拟列表视图
+
+    只创建填满可见区域的行控件，滚动时复用这些行控件并重新绑定数据，
+    内存占用和每次滚动的耗时与列表项数量无关，适合文件浏览、日志等大量条目。
+    """
+
+    _first = 0  # 第一个可见行对应的列表项索引
+
+    def __init__(
+        self,
+        pos,
+        wh,
+        count: int,
+        create_item,
+        bind_item,
+        item_height: int,
+        color=WHITE,
+        loop_focus=False,
+    ) -> None:
+        """
+        Args:
+            count: 列表项数量
+            create_item: 创建一个行控件(XCtrl)的函数，无参数
+            bind_item: 将数据绑定到行控件的函数，固定传入行控件和列表项索引两个参数
+            item_height: 行高
+            color: 边框颜色.
+        """
+        super().__init__(pos, wh, loop_focus, True, color)
+        self._count = count
+        self._create_item = create_item
+        self._bind_item = bind_item
+        self._item_height = item_height
+
+    @property
+    def index(self) -> int:
+        """当前焦点所在的列表项索引"""
+        return self._first + self._focus_index
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def set_count(self, count: int):
+        """修改列表项数量并重新绑定可见行"""
+        self._count = count
+        index = min(self.index, max(count - 1, 0))
+        self._first = 0
+        self._focus_index = 0
+        self._adjust_layout()
+        self._scroll_to(index)
+        self.clear()
+
+    def refresh(self):
+        """数据发生变化后重新绑定可见行"""
+        self._bind_rows()
+        self.clear()
+
+    def add_widget(self, widget: XWidget) -> None:
+        raise TypeError("XVirtualListView creates its rows with create_item")
+
+    def add_widgets(self, widgets: list[XWidget] | tuple[XWidget, ...]) -> None:
+        raise TypeError("XVirtualListView creates its rows with create_item")
+
+    def _bind_rows(self):
+        bind_item = self._bind_item
+        first = self._first
+        for i, child in enumerate(self._children):
+            bind_item(child, first + i)
+
+    def _adjust_layout(self) -> None:
+        w, h = self._layout_wh
+        if h == 0:
+            return
+        item_height = self._item_height
+        rows = min(self._count, max(1, h // item_height))
+        children = self._children
+        # 创建或移除行控件，使行数刚好填满可见区域
+        self.begin_layout()
+        while len(children) > rows:
+            child = children.pop()
+            self._focus_list.pop()
+            child.set_parent(None)  # type: ignore
+        while len(children) < rows:
+            self._add_widget(self._create_item())
+        for i, child in enumerate(children):
+            child.set_transfer((0, i * item_height), (w, item_height))
+        self.commit_layout()
+        if self._focus_index >= rows:
+            self._focus_index = max(rows - 1, 0)
+        # 可见区域变大时避免绑定超出范围的列表项
+        self._first = max(min(self._first, self._count - rows), 0)
+        self._bind_rows()
+
+    def _scroll_to(self, index: int):
+        """滚动使列表项index可见并设置焦点"""
+        rows = len(self._children)
+        if not rows:
+            return
+        first = self._first
+        if index < first:
+            first = index
+        elif index >= first + rows:
+            first = index - rows + 1
+        old = self._focus_list[self._focus_index]
+        if first != self._first:
+            self._shift_rows(first)
+        # 行控件带着焦点轮廓一起平移，只需要修改焦点变化的两行
+        self._focus_index = index - first
+        if self._enter:
+            old.focused = False
+            self._focus_list[self._focus_index].focused = True
+
+    def _shift_rows(self, first: int):
+        """复用行控件显示从first开始的列表项
+
+        移出可见区域的行控件移到另一端并重新绑定，其余行控件和已经绘制的像素一起平移，
+        只有重新绑定的行需要重绘。
+        """
+        children = self._children
+        rows = len(children)
+        d = first - self._first
+        self._first = first
+        if self._cleared or abs(d) >= rows or self._layout_wh == (0, 0):
+            # 没有可以复用的像素
+            self._bind_rows()
+            self.clear()
+            return
+
+        item_height = self._item_height
+        display = GuiSingle.GUI_SINGLE.display  # type: ignore
+        _scroll_rows(
+            self,
+            0,
+            rows * item_height,
+            -d * item_height,
+            self.get_absolute_pos()[0] == 0 and self._wh[0] == display.width,
+        )
+        children[:] = children[d:] + children[:d]
+        focus_list = self._focus_list
+        focus_list[:] = focus_list[d:] + focus_list[:d]
+        dirty = []  # 滚动前就需要的重绘
+        for child in children:
+            _collect_redraw(child, dirty)
+        self.begin_layout()
+        for i in range(rows):
+            children[i].set_pos((0, i * item_height))
+        # 像素已经平移到位，不需要擦除整个容器
+        self._clear_pending = False
+        self.commit_layout()
+        for child in children:
+            _reset_redraw(child)
+        for widget in dirty:
+            widget._request_redraw()
+        bind_item = self._bind_item
+        for i in range(rows - d, rows) if d > 0 else range(-d):
+            child = children[i]
+            _erase_rows(self, i * item_height, item_height)
+            bind_item(child, first + i)
+            child._event_receiver(CLEAR_DRAW_AREA_EVENT)
+
+    def _key_response(self, key: int):
+        if self._enter and (key == KEY_UP or key == KEY_DOWN):
+            count = self._count
+            if not count:
+                return
+            index = self.index
+            if key == KEY_UP:
+                index = (index - 1) % count if self._loop_focus else max(index - 1, 0)
+            else:
+                index = (
+                    (index + 1) % count
+                    if self._loop_focus
+                    else min(index + 1, count - 1)
+                )
+            self._scroll_to(index)
+            return
+        return super()._key_response(key)
+
+
 class XVHBox(XFrameLayout):
     """垂直/水平盒子视图。控件垂直/水平布局"""
 
@@ -55,95 +361,108 @@ class XVHBox(XFrameLayout):
         self._vertical = vertical
 
     def _adjust_layout(self) -> None:
+        vertical = self._vertical
+        # 测量: 子控件在排列方向上的期望厚度，已缓存的测量结果不会重新计算
+        thicknesses = [child.measure()[vertical] for child in self._children]
         spacing = 0
         if self._average:
-            # 获取子控件高度和
-            total_thickness = sum(
-                [child._wh[self._vertical] for child in self._children]
-            )
             # 计算控件间距
-            spacing = max(0, (self._layout_wh[self._vertical] - total_thickness)) // (
-                len(self._children) + 1
+            total_thickness = sum(thicknesses)
+            spacing = max(0, (self._layout_wh[vertical] - total_thickness)) // (
+                len(thicknesses) + 1
             )
 
+        # 排列: 在一个事务中应用所有子控件的位置和大小
         offset = spacing
-        for child in self._children:
-            if self._vertical:
-                child.set_transfer((0, offset), (self._layout_wh[0], child._wh[1]))
+        w, h = self._layout_wh
+        self.begin_layout()
+        for child, thickness in zip(self._children, thicknesses):
+            if vertical:
+                child.set_transfer((0, offset), (w, thickness))
             else:
-                child.set_transfer((offset, 0), (child._wh[0], self._layout_wh[1]))
-            offset += child._wh[self._vertical] + spacing
+                child.set_transfer((offset, 0), (thickness, h))
+            offset += thickness + spacing
+        self.commit_layout()
+
+    def _child_measure_changed(self, child: XWidget):
+        self._request_adjust()
 
 
 class XGridBox(XFrameLayout):
-    """网格盒子视图。控件网格布局"""
+    """网格盒子视图。控件网格布局
+
+    维护控件到行列的索引，焦点顺序按行优先在调整布局时直接生成，
+    同时计算每个焦点控件在左右上下方向最近的焦点控件，
+    左右键(spatial_focus为True时还有上下键)按行列移动焦点时直接查表。
+    """
 
     # 很显然添加控件需要输入行列参数
     # 但是为了保持add_widget的基本行为，已经规定了不能重写
     # 正在想一种更好的解决方法
 
-    def __init__(self, pos, wh, row, col, color=WHITE, spacing=2) -> None:
+    _free_hint = 0  # 第一个可能为空的格子(行优先序号)，在此之前的格子都已被占用
+    _neighbors = array("h")  # 每个焦点控件左右上下最近的焦点控件的索引，没有时为-1
+
+    NEIGHBOR_LEFT = const(0)
+    NEIGHBOR_RIGHT = const(1)
+    NEIGHBOR_UP = const(2)
+    NEIGHBOR_DOWN = const(3)
+
+    def __init__(
+        self, pos, wh, row, col, color=WHITE, spacing=2, spatial_focus=False
+    ) -> None:
         """
         Args:
             color: 边框颜色.
-            average: 是否平均分配控件位置.
+            spacing: 控件与格子边缘的间距.
+            spatial_focus: 上下键按列移动焦点，否则按顺序切换焦点.
         """
         super().__init__(pos, wh, False, True, color)
-        self._rows: list[list[XWidget | None]] = []
-        self._rows.append([None for _ in range(col)])
+        self._rows: list[list[XWidget | None]] = [[None] * col for _ in range(row)]
         self._max_row = row
         self._max_col = col
         self._spacing = spacing
+        self._spatial_focus = spatial_focus
+        self._cells: dict[XWidget, tuple[int, int]] = {}  # 子控件所在的行列
+        self._focus_indices: dict[XCtrl, int] = {}  # 子控件在焦点列表中的索引
 
     def add_widget_row_col(self, widget: XWidget, row, col):
-        if row > self._max_row or col > self._max_col or row < 0 or col < 0:
+        if row >= self._max_row or col >= self._max_col or row < 0 or col < 0:
             raise IndexError("Invaild index.")
-        for _ in range(row, self._max_row):
-            self._rows.append([None for _ in range(self._max_col)])
-        if self._rows[row][col] is None:
-            self._rows[row][col] = widget
-        else:
+        if self._rows[row][col] is not None:
             raise IndexError("This index is not empty")
+        self.begin_layout()
+        self._place(widget, row, col)
         super()._add_widget(widget)
-        self._adjust_layout()
+        self._adjust_pending = True
+        self.commit_layout()
 
     def find_child(self, widget: XWidget) -> None | tuple[int, int]:
-        for row, list_row in enumerate(self._rows):
-            for col, child in enumerate(list_row):
-                if widget == child:
-                    return (row, col)
-        return None
+        return self._cells.get(widget)
+
+    def _place(self, widget: XWidget, row: int, col: int):
+        self._rows[row][col] = widget
+        self._cells[widget] = (row, col)
 
     def _add_widget(self, widget: XWidget):
-        # 自动补位添加
-        # 遍历找寻空位
-        found_empty = False
-        for row, list_row in enumerate(self._rows):
-            for col, widget_ in enumerate(list_row):
-                if widget_ is None:
-                    found_empty = True
-                    empty_row = row
-                    empty_col = col
-                    break
-                else:
-                    continue
-            if found_empty:
-                break
-        if found_empty:
-            self._rows[empty_row][empty_col] = widget
-        elif len(list_row) < self._max_row:
-            new_row: list[XWidget | None] = [None for _ in range(self._max_col)]
-            new_row[0] = widget
-            self._rows.append(new_row)
-        else:
+        # 自动补位添加，从第一个可能为空的格子开始找
+        max_col = self._max_col
+        rows = self._rows
+        index = self._free_hint
+        total = self._max_row * max_col
+        while index < total and rows[index // max_col][index % max_col] is not None:
+            index += 1
+        if index == total:
             raise IndexError("Space is full.")
+        self._free_hint = index + 1
+        self._place(widget, index // max_col, index % max_col)
         super()._add_widget(widget)
 
-    def _child_weight(self, widget: XWidget):
-        tmp = self.find_child(widget)
-        if tmp is None:
-            return -1
-        return 3 * tmp[0] + tmp[1]
+    def _remove_widget(self, widget: XWidget):
+        super()._remove_widget(widget)
+        row, col = self._cells.pop(widget)
+        self._rows[row][col] = None
+        self._free_hint = min(self._free_hint, row * self._max_col + col)
 
     def _adjust_layout(self) -> None:
         w, h = self._layout_wh
@@ -152,17 +471,87 @@ class XGridBox(XFrameLayout):
         y_offset = 0
         spacing = self._spacing
         double_spacing = 2 * spacing
-        for row, list_row in enumerate(self._rows):
+        # 按行优先顺序重新生成焦点列表，已进入时保持焦点所在的控件不变
+        focused = (
+            self._focus_list[self._focus_index]
+            if self._enter and self._focus_list
+            else None
+        )
+        focus_list = []
+        focus_indices = {}
+        self.begin_layout()
+        for list_row in self._rows:
             x_offset = 0
-            for col, child in enumerate(list_row):
-                if child is None:
-                    x_offset += col_width
-                    continue
-                else:
+            for child in list_row:
+                if child is not None:
                     child.set_transfer(
                         (x_offset + spacing, y_offset + spacing),
                         (col_width - double_spacing, row_height - double_spacing),
                     )
+                    if isinstance(child, XCtrl):
+                        focus_indices[child] = len(focus_list)
+                        focus_list.append(child)
                 x_offset += col_width
             y_offset += row_height
-        self._focus_list.sort(key=lambda child: self._child_weight(child))
+        self.commit_layout()
+        self._focus_list = focus_list
+        self._focus_indices = focus_indices
+        self._neighbors = self._build_neighbors(focus_indices)
+        if focused is not None:
+            self._focus_index = focus_indices.get(focused, 0)
+        elif self._focus_index >= len(focus_list):
+            self._focus_index = 0
+
+    def _build_neighbors(self, focus_indices: dict[XCtrl, int]) -> array:
+        """沿每行每列扫描一次，记录焦点控件在四个方向上最近的焦点控件"""
+        rows = self._rows
+        max_row = self._max_row
+        max_col = self._max_col
+        neighbors = array("h", [-1] * (4 * len(focus_indices)))
+        for row in range(max_row):
+            last = -1
+            for col in range(max_col):
+                index = focus_indices.get(rows[row][col], -1)  # type: ignore
+                if index >= 0:
+                    if last >= 0:
+                        neighbors[4 * index + XGridBox.NEIGHBOR_LEFT] = last
+                        neighbors[4 * last + XGridBox.NEIGHBOR_RIGHT] = index
+                    last = index
+        for col in range(max_col):
+            last = -1
+            for row in range(max_row):
+                index = focus_indices.get(rows[row][col], -1)  # type: ignore
+                if index >= 0:
+                    if last >= 0:
+                        neighbors[4 * index + XGridBox.NEIGHBOR_UP] = last
+                        neighbors[4 * last + XGridBox.NEIGHBOR_DOWN] = index
+                    last = index
+        return neighbors
+
+    def _move_focus(self, direction: int):
+        """把焦点移动到direction方向最近的可以获得焦点的控件，没有时不移动"""
+        offset = 4 * self._focus_index + direction
+        if offset >= len(self._neighbors):
+            # 布局事务中添加的控件还没有调整布局
+            return
+        index = self._neighbors[offset]
+        if index >= 0:
+            self._focus_list[self._focus_index].focused = False
+            self._focus_index = index
+            self._focus_list[index].focused = True
+
+    def _key_response(self, key: int):
+        if self._enter and self._focus_list:
+            if key == KEY_LEFT or key == KEY_RIGHT:
+                self._move_focus(
+                    XGridBox.NEIGHBOR_LEFT
+                    if key == KEY_LEFT
+                    else XGridBox.NEIGHBOR_RIGHT
+                )
+                return
+            if self._spatial_focus and (key == KEY_UP or key == KEY_DOWN):
+                self._move_focus(
+                    XGridBox.NEIGHBOR_UP if key == KEY_UP else XGridBox.NEIGHBOR_DOWN
+                )
+                return
+        return super()._key_response(key)
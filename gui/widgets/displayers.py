@@ -1,3 +1,5 @@
+import asyncio
+import framebuf
 from .base import *
 from math import floor
 
@@ -5,8 +7,30 @@ from math import floor
 class XPlainTextView(XLayout):
     """多行多页文本显示控件，XText本身支持多行显示。本控件支持多页翻页显示"""
 
-    def __init__(self, pos, wh, default_context="", color=WHITE) -> None:
+    _cache_wh = (0, 0)  # 页缓存对应的绘制区域宽高
+    _cache_version = 0  # 文本变化时增加，使正在渲染的页作废
+    _caching = False  # 渲染页缓存的任务正在运行
+
+    def __init__(
+        self,
+        pos,
+        wh,
+        default_context="",
+        color=WHITE,
+        line_scroll=False,
+        page_cache=False,
+    ) -> None:
+        """
+        Args:
+            line_scroll: 上下键逐行滚动而不是翻页，只绘制新露出的一行.
+            page_cache: 空闲时预先渲染前后页，翻页时直接绘制渲染好的页.
+        """
         super().__init__(pos, wh, color, self._key_response)
+        self._line_scroll = line_scroll
+        # 页缓存{页码: (缓冲区, MONO_HLSB帧缓冲)}，只保留当前页和前后页
+        self._page_cache: dict | None = {} if page_cache else None
+        self._free_buffers: list[bytearray] = []  # 可以复用的页缓冲区
+        self._palette = FrameBuffer(bytearray(4), 2, 1, framebuf.RGB565)
         self.__text = XText((0, 16), default_context)
         super().add_widget(self.__text)
         self._page_height = floor((self._wh[1] - 16) / self.__text._font_size) * self.__text._font_size  # type: ignore
@@ -38,24 +62,144 @@ class XPlainTextView(XLayout):
         # )  # Debug
         self.__page_show.context = f"1/{self._total_pages}"
         self.__text._scrollbar_pos = 0
+        if self._page_cache is not None:
+            self._drop_page_cache()
+            self._request_page_cache()
 
     def _key_response(self, key):
         if key == KEY_ESCAPE:
             return ESC
+        if self._line_scroll:
+            if key == KEY_DOWN or key == KEY_UP:
+                self._scroll_line(1 if key == KEY_DOWN else -1)
+            return
         if key == KEY_DOWN:
             if self._page < self._total_pages:
-                self._draw_area.fill(0)
-
-                self.__text._set_scrollbar_pos(
-                    self.__text._scrollbar_pos + self._page_height
-                )
-                self._page += 1
+                self._turn_page(1)
                 # print("下翻页")  # Debug
         if key == KEY_UP:
             if self._page > 1:
-                self._draw_area.fill(0)
-                self.__text._set_scrollbar_pos(
-                    self.__text._scrollbar_pos - self._page_height
-                )
-                self._page -= 1
+                self._turn_page(-1)
         self.__page_show.context = f"{self._page}/{self._total_pages}"
+
+    def _turn_page(self, step: int):
+        """翻页，step为1向下，为-1向上"""
+        text = self.__text
+        self._page += step
+        cache = self._page_cache
+        cached = None
+        if cache is not None and self._cache_wh == self._layout_wh:
+            cached = cache.get(self._page)
+        if cached is None:
+            self.clear()
+            text._set_scrollbar_pos(text._scrollbar_pos + step * self._page_height)
+        else:
+            text._scrollbar_pos += step * self._page_height
+            # 用文字颜色的调色板直接绘制渲染好的页，背景同时被覆盖
+            w, h = self._layout_wh
+            top = text._pos[1]
+            palette = self._palette
+            palette.pixel(1, 0, text._color)
+            area = self._draw_area
+            area.fill_rect(0, 0, w, top, 0)
+            area.blit(cached[1], 0, top, -1, palette)
+            self._mark_dirty_rows(0, h)
+            text._redraw_flag = False
+        if cache is not None:
+            self._request_page_cache()
+
+    def _drop_page_cache(self):
+        cache = self._page_cache
+        for page in list(cache):  # type: ignore
+            self._free_buffers.append(cache.pop(page)[0])  # type: ignore
+        self._cache_version += 1
+
+    def _request_page_cache(self):
+        if not self._caching:
+            self._caching = True
+            asyncio.create_task(self.__cache_pages())
+
+    async def __cache_pages(self):
+        """空闲时把当前页的前后页渲染到页缓存"""
+        cache: dict = self._page_cache  # type: ignore
+        while self._layout_wh != (0, 0):
+            if self._cache_wh != self._layout_wh:
+                self._drop_page_cache()
+                self._free_buffers.clear()
+                self._cache_wh = self._layout_wh
+            page = self._page
+            for cached in list(cache):
+                if abs(cached - page) > 1:
+                    self._free_buffers.append(cache.pop(cached)[0])
+            for wanted in (page + 1, page - 1):
+                if 1 <= wanted <= self._total_pages and wanted not in cache:
+                    break
+            else:
+                break
+            await self.__render_page(wanted)
+        self._caching = False
+
+    async def __render_page(self, page: int):
+        """逐行渲染一页到MONO_HLSB缓冲区，每行让出一次，不影响按键响应"""
+        text = self.__text
+        w, h = self._layout_wh
+        rows = h - text._pos[1]
+        size = framebuf_size(w, rows, framebuf.MONO_HLSB)
+        buffers = self._free_buffers
+        buffer = buffers.pop() if buffers else bytearray(size)
+        frame = FrameBuffer(buffer, w, rows, framebuf.MONO_HLSB)
+        frame.fill(0)
+        version = self._cache_version
+        gui = GuiSingle.GUI_SINGLE
+        font_size = text._font_size
+        line = (page - 1) * self._page_height // font_size
+        for y in range(0, rows, font_size):
+            gui.draw_text_lines(text, frame, line, line + 1, y)  # type: ignore
+            line += 1
+            await asyncio.sleep(0)
+            if version != self._cache_version:
+                # 渲染期间文本或尺寸发生了变化
+                buffers.append(buffer)
+                return
+        self._page_cache[page] = (buffer, frame)  # type: ignore
+
+    def _scroll_line(self, step: int):
+        """滚动一行，step为1向下，为-1向上"""
+        text = self.__text
+        font_size = text._font_size
+        pos = text._scrollbar_pos + step * font_size
+        lines = len(text._lines_index) - 1
+        max_pos = max(lines * font_size - self._page_height, 0)
+        if pos < 0 or pos > max_pos:
+            return
+        w, h = self._layout_wh
+        top = text._pos[1]
+        if self._cleared or text._redraw_flag or h <= top + font_size:
+            # 没有可以复用的像素
+            text._scrollbar_pos = pos
+            self.clear()
+        else:
+            text._scrollbar_pos = pos
+            dy = -step * font_size
+            x, y = self._clip_rect[:2]  # type: ignore
+            gui = GuiSingle.GUI_SINGLE
+            display = gui.display  # type: ignore
+            # 绘制区域占满屏幕宽度时使用屏幕的硬件滚动，只需要传输新露出的一行
+            if not (
+                x == 0
+                and w == display.width
+                and display.scroll_rows(y + top, h - top, dy)
+            ):
+                display.scroll_rect(x, y + top, w, h - top, dy)
+                self._mark_dirty_rows(top, h - top)
+            strip = top if step < 0 else h - font_size
+            self._draw_area.fill_rect(0, strip, w, font_size, 0)
+            self._mark_dirty_rows(strip, font_size)
+            gui.draw_text(text, rows=(strip, strip + font_size))  # type: ignore
+        # 滚动到底时显示为最后一页
+        page = self._total_pages if pos == max_pos else pos // self._page_height + 1
+        if page != self._page:
+            self._page = page
+            self._draw_area.fill_rect(0, 0, w, top, 0)
+            self._mark_dirty_rows(0, top)
+            self.__page_show.context = f"{page}/{self._total_pages}"
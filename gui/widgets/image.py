@@ -1,28 +1,54 @@
+import asyncio
 from .base import XWidget
-from ..utils.core import combined_rgb565, separate_rgb565
+from ..utils.core import GuiSingle, combined_rgb565, separate_rgb565
 from ..utils.texture import *
 from ..utils.colors import WHITE
 
 
 class XImage(XWidget):
 
+    _placeholder_drawn = False
+
     def __init__(
         self,
         pos,
         wh,
-        raw_data: str | bytes,
+        raw_data: str | bytes | None = None,
         color=WHITE,
         background_color=None,
         *,
         texture2d: Texture2D | None = None,
-        stream_loading=True
+        stream_loading=True,
+        scale_to_fit=False,
+        async_loading=False,
+        progressive=0
     ) -> None:
+        """
+        Args:
+            raw_data: 图像路径或原始数据
+            background_color: 背景颜色，为None时背景透明(仅对使用调色板的图像有效)
+            texture2d: 使用已经创建的纹理或图集中的TextureRegion，忽略raw_data
+            stream_loading: 流式加载纹理
+            scale_to_fit: 在解码时将超出wh的图像按比例缩小，内存中只保存缩小后的图像
+            async_loading: 非流式加载时在后台任务中解码，完成前绘制占位矩形
+            progressive: 渐进显示(仅流式加载)，每解码并绘制该数量的行就立即写入显示器，为0时关闭
+        """
         super().__init__(pos, wh, color)
         self.background_color = background_color
+        self.progressive = progressive
         # 读取文件并判断格式
         self.texture = (
-            Texture2D(raw_data, not stream_loading) if texture2d is None else texture2d
+            Texture2D(
+                raw_data,
+                not stream_loading,
+                wh if scale_to_fit else None,
+                async_loading and not stream_loading,
+            )
+            if texture2d is None
+            else texture2d
         )
+        if not getattr(self.texture, "ready", True):
+            asyncio.create_task(self.__load())
         self.img_type = self.texture.img_format
         self.index_color = False
 
@@ -48,28 +74,90 @@ class XImage(XWidget):
         else:
             self.palette_used = False
 
+    def _opaque_bounds(self) -> tuple[int, int, int, int] | None:
+        # 使用透明色(调色板图像没有背景颜色)时不透明的只是部分像素
+        if self.palette_used and self.background_color is None:
+            return None
+        texture = self.texture
+        if not getattr(texture, "ready", True):
+            # 占位矩形
+            return None if self.background_color is None else self._pos + self._wh
+        return self._pos + (texture.w, texture.h)
+
+    async def __load(self):
+        try:
+            await self.texture.load()
+        except Exception:
+            # 解码失败时保留占位矩形，异常保存在纹理的error中
+            return
+        self._request_redraw()
+
     def _draw(self) -> None:
         # 如果纹理是以bitmap方式加载的，可以直接绘制
         # 如果纹理是以流式方式或非bitmap加载的，则需要使用迭代器逐行绘制
         x, y = self._pos
 
         texture = self.texture
+        draw_area = self._parent._draw_area
+
+        if not getattr(texture, "ready", True):
+            # 占位矩形
+            w, h = self._wh
+            if self.background_color is not None:
+                draw_area.rect(x, y, w, h, self.background_color, True)
+            draw_area.rect(x, y, w, h, self._color)
+            self._placeholder_drawn = True
+            return
+        if self._placeholder_drawn:
+            # 擦除占位矩形，透明图像不会完全覆盖它，有背景颜色的容器需要恢复背景
+            w, h = self._wh
+            background = getattr(self._parent, "_background_color", None)
+            draw_area.fill_rect(x, y, w, h, 0 if background is None else background)
+            self._placeholder_drawn = False
+
+        if texture.type == Texture2D.TEX_BITMAP:
+            if self.palette_used:
+                alpha_color = 0 if self.background_color is None else -1
+                draw_area.blit(texture.bitmap_frame, x, y, alpha_color, self.palette)
+            else:
+                draw_area.blit(texture.bitmap_frame, x, y)
+            return
+
+        # 流式纹理只解码容器绘制区域内可见的部分
+        layout_w, layout_h = self._parent._layout_wh
+        row_begin = max(0, -y)
+        row_end = min(texture.h, layout_h - y)
+        col_begin = max(0, -x)
+        col_end = min(texture.w, layout_w - x)
+        if row_begin >= row_end or col_begin >= col_end:
+            return
 
+        y += row_begin
+        rows = texture.scanlines(row_begin, row_end, col_begin, col_end)
         if self.palette_used:
             palette = self.palette
             alpha_color = 0 if self.background_color is None else -1
-            if texture.type == Texture2D.TEX_BITMAP:
-                self._parent._draw_area.blit(
-                    texture.bitmap_frame, *self._pos, alpha_color, palette
-                )
-            else:
-                for row_frame in texture:
-                    self._parent._draw_area.blit(row_frame, x, y, alpha_color, palette)
-                    y += 1
         else:
-            if texture.type == Texture2D.TEX_BITMAP:
-                self._parent._draw_area.blit(texture.bitmap_frame, *self._pos)
-            else:
-                for row_frame in texture:
-                    self._parent._draw_area.blit(row_frame, x, y)
-                    y += 1
+            palette = None
+            alpha_color = -1
+        progressive = self.progressive
+        if not progressive:
+            for row_frame in rows:
+                draw_area.blit(row_frame, x, y, alpha_color, palette)
+                y += 1
+            return
+
+        # 渐进显示: 图像从上到下逐渐出现，不需要等待整个图像解码完成
+        display = GuiSingle.GUI_SINGLE.display
+        flush_y = self.get_absolute_pos()[1] + row_begin
+        pending = 0
+        for row_frame in rows:
+            draw_area.blit(row_frame, x, y, alpha_color, palette)
+            y += 1
+            pending += 1
+            if pending == progressive:
+                display.update_rows(flush_y, pending)
+                flush_y += pending
+                pending = 0
+        if pending:
+            display.update_rows(flush_y, pending)
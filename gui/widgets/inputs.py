@@ -104,11 +104,11 @@ class XSlider(XCtrl):
         elif KEY_ID == KEY_RIGHT or KEY_ID == KEY_DOWN:
             if self._value != self._range[0]:
                 self._value -= 1
-                self._redraw_flag = True
+                self._request_redraw()
         elif KEY_ID == KEY_LEFT or KEY_ID == KEY_UP:
             if self._value != self._range[1]:
                 self._value += 1
-                self._redraw_flag = True
+                self._request_redraw()
 
     @property
     def value(self) -> int:
@@ -119,7 +119,7 @@ class XSlider(XCtrl):
         min_val, max_val = self._range
         if min_val <= val <= max_val:
             self._value = val
-            self._redraw_flag = True
+            self._request_redraw()
 
     @property
     def percent(self) -> float:
@@ -167,17 +167,19 @@ class XSpinBox(XLayout):
         elif KEY_ID == KEY_RIGHT or KEY_ID == KEY_DOWN:
             if self._value != self._range[0]:
                 self._value -= 1
-                self.xtext.context = self._prefix + str(self._value) + self._suffix
-                self.clear()
+                self._update_text()
         elif KEY_ID == KEY_LEFT or KEY_ID == KEY_UP:
             if self._value != self._range[1]:
                 self._value += 1
-                self.xtext.context = self._prefix + str(self._value) + self._suffix
-                self.clear()
+                self._update_text()
+
+    def _update_text(self):
+        self.xtext.update_context(self._prefix + str(self._value) + self._suffix)
 
     def _calc_draw_area(self) -> tuple[tuple[int, int], tuple[int, int]]:
         w, h = self._wh
-        return (BORDER, BORDER), (w - XSpinBox.ARRAY_WITHD, h - D_BORDER)
+        # 绘制区域不能覆盖右侧的箭头，否则擦除文字时会擦掉箭头
+        return (BORDER, BORDER), (w - XSpinBox.ARRAY_WITHD - BORDER, h - D_BORDER)
 
     def _draw(self):
         layout = self._parent._draw_area
@@ -238,8 +240,7 @@ class XSpinBox(XLayout):
         min_val, max_val = self._range
         if min_val <= val <= max_val:
             self._value = val
-            self.xtext.context = self._prefix + str(self._value) + self._suffix
-            self.clear()
+            self._update_text()
 
     @property
     def suffix(self) -> str:
@@ -249,8 +250,7 @@ class XSpinBox(XLayout):
     def suffix(self, suffix: str):
         if self._suffix != suffix:
             self._suffix = suffix
-            self.xtext.context = self._prefix + str(self._value) + self._suffix
-            self.clear()
+            self._update_text()
 
     @property
     def prefix(self) -> str:
@@ -260,8 +260,7 @@ class XSpinBox(XLayout):
     def set_prefix(self, prefix: str):
         if self._prefix != prefix:
             self._prefix = prefix
-            self.xtext.context = self._prefix + str(self._value) + self._suffix
-            self.clear()
+            self._update_text()
 
     def set_range(self, range: tuple[int, int]):
         if self._range == range:
@@ -8,6 +8,9 @@ from .widgets.base import *
 
 DEBUG = True
 
+_TEXT_METRICS_SIZE = const(32)  # 文本测量缓存的最大条目数
+_TEXT_METRICS_MAX_LEN = const(64)  # 只缓存不超过该长度的文本，长文本的结果太大
+
 
 def timed_function(f, *args, **kwargs):
     myname = str(f).split(" ")[1]
@@ -38,29 +41,22 @@ class XT_GUI:
     # 属于是python自身的性能问题，目前无解
     # 可以尝试利用全角字符缓冲区的特性，将两个半角字符的数据存入其中，同时绘制，减少绘制次数
     # micropython的bytearray不支持自定义步长访问，在全角字符缓冲区存入两个半角字符的数据相当困难
-    def draw_text(self, xtext: XText, overlap=True):
-        draw_area = xtext._parent._draw_area
-        autowarp = xtext._autowrap
+    def draw_text(self, xtext: XText, overlap=True, rows=None):
+        """绘制文字控件
+
+        Args:
+            rows: (起始y, 结束y)，只绘制与绘制区域中这些行相交的文本行.
+        """
         x, y = xtext._pos
         scrollbar_pos = xtext._scrollbar_pos
-        w, h = xtext._wh
-        alpha = 0 if overlap else -1
-
-        initial_x = x
-        font = self.font
+        h = xtext._wh[1]
         font_size = xtext._font_size
-        if font_size != font.font_size:
+        if font_size != self.font.font_size:
             return
-        half_size = font_size >> 1
-        # 每行最后一个字最大x坐标
-        last_char_x = w - font_size
 
         palette = self.pa_cache
         palette.pixel(1, 0, xtext._color)
 
-        word_frame = self._word_frame
-        half_word_frame = self._half_word_frame
-        word_buf = self._word_buf
         # 计算要绘制的起始行和结束行
         begin_line = floor((max(-y, 0) + scrollbar_pos) / font_size)
         end_line = min(
@@ -69,13 +65,164 @@ class XT_GUI:
         )
         if begin_line >= len(xtext._lines_index):
             return
-        begin_index = xtext._lines_index[begin_line]
-        end_index = xtext._lines_index[end_line]
         # 开始绘制
         # 有很多bug
         if y < 0:
             y = -((-y) % font_size)
+        if rows is not None:
+            top = y - begin_line * font_size
+            clip_begin = max(floor((rows[0] - top) / font_size), begin_line)
+            end_line = min(ceil((rows[1] - top) / font_size), end_line)
+            if clip_begin >= end_line:
+                return
+            y += (clip_begin - begin_line) * font_size
+            begin_line = clip_begin
+        self._draw_chars(
+            xtext._parent._draw_area,
+            xtext,
+            xtext._lines_index[begin_line],
+            xtext._lines_index[end_line],
+            x,
+            y,
+            0 if overlap else -1,
+            palette,
+        )
+
+    def draw_text_diff(self, xtext: XText, old_context: str, old_lines):
+        """只重绘文字控件中与屏幕上的旧内容不同的字
+
+        按行逐字比较，宽度相同的字只擦除并重绘内容变化的字格，
+        从第一个宽度不同的字开始重绘该行剩余部分，只标记修改过的行。
+        行数变化、滚动或控件部分超出容器时擦除旧文本并重绘整个控件。
+
+        Args:
+            old_context: 屏幕上显示的旧内容
+            old_lines: 旧内容的行索引
+        """
+        x0, y = xtext._pos
+        w, h = xtext._wh
+        font_size = xtext._font_size
+        area = xtext._parent._draw_area
+        new_lines = xtext._lines_index
+        abs_y = xtext.get_absolute_pos()[1]
+        display = self.display
+        if (
+            font_size != self.font.font_size
+            or len(old_lines) != len(new_lines)
+            or xtext._scrollbar_pos
+            or y < 0
+        ):
+            # 换行结构变化，擦除旧文本后完整重绘
+            self.erase_text(xtext, max(len(old_lines), len(new_lines)) - 1)
+            self.draw_text(xtext)
+            return
+
+        palette = self.pa_cache
+        palette.pixel(1, 0, xtext._color)
+        half_size = font_size >> 1
+        context = xtext._context
+        for line in range(len(new_lines) - 1):
+            if y >= h:
+                break
+            old_begin, old_end = old_lines[line], old_lines[line + 1]
+            new_begin, new_end = new_lines[line], new_lines[line + 1]
+            if old_context[old_begin:old_end] == context[new_begin:new_end]:
+                y += font_size
+                continue
+            x = x0
+            dirty = False
+            old_index, new_index = old_begin, new_begin
+            while old_index < old_end and new_index < new_end:
+                old_char = old_context[old_index]
+                new_char = context[new_index]
+                if ord(old_char) < 0x20 or ord(new_char) < 0x20:
+                    break
+                char_w = half_size if ord(old_char) <= 0x7F else font_size
+                if char_w != (half_size if ord(new_char) <= 0x7F else font_size):
+                    break
+                if old_char != new_char and x < w:
+                    # 宽度相同的字，只重绘这一个字格
+                    area.fill_rect(x, y, char_w, font_size, 0)
+                    self._draw_chars(
+                        area, xtext, new_index, new_index + 1, x, y, 0, palette
+                    )
+                    dirty = True
+                x += char_w
+                old_index += 1
+                new_index += 1
+            if old_index < old_end or new_index < new_end:
+                # 字宽不同之后的字位置都变了，擦除并重绘该行剩余部分
+                tail_w = max(
+                    self._chars_width(old_context, old_index, old_end, font_size),
+                    self._chars_width(context, new_index, new_end, font_size),
+                )
+                area.fill_rect(x, y, tail_w, font_size, 0)
+                self._draw_chars(area, xtext, new_index, new_end, x, y, 0, palette)
+                dirty = True
+            if dirty:
+                display.mark_dirty(abs_y + y - xtext._pos[1], font_size)
+            y += font_size
+
+    def erase_text(self, xtext: XText, lines: int):
+        """擦除文字控件前lines行文本占用的区域，并标记修改的行"""
+        x, y = xtext._pos
+        w, h = xtext._wh
+        rows = min(lines * xtext._font_size, h - y)
+        if rows > 0:
+            xtext._parent._draw_area.fill_rect(x, y, w - x, rows, 0)
+            self.display.mark_dirty(xtext.get_absolute_pos()[1], rows)
+
+    @staticmethod
+    def _chars_width(text: str, begin: int, end: int, font_size: int) -> int:
+        """text[begin:end]不换行时占用的宽度"""
+        half_size = font_size >> 1
+        width = 0
+        for char in text[begin:end]:
+            if ord(char) >= 0x20:
+                width += half_size if ord(char) <= 0x7F else font_size
+        return width
+
+    def draw_text_lines(
+        self, xtext: XText, target, begin_line: int, end_line: int, y=0
+    ):
+        """将文字控件的第begin_line到end_line行(不含)绘制到target的y处
+
+        target为MONO_HLSB帧缓冲时只写入文字的点阵，之后可以用调色板把它绘制到屏幕上。
+        """
+        if xtext._font_size != self.font.font_size:
+            return
+        lines_index = xtext._lines_index
+        end_line = min(end_line, len(lines_index) - 1)
+        if begin_line >= end_line:
+            return
+        self._draw_chars(
+            target,
+            xtext,
+            lines_index[begin_line],
+            lines_index[end_line],
+            xtext._pos[0],
+            y,
+            0,
+            None,
+        )
+
+    def _draw_chars(
+        self, draw_area, xtext: XText, begin_index, end_index, x, y, alpha, palette
+    ):
+        """逐字绘制文字控件内容中[begin_index, end_index)的字符"""
+        autowarp = xtext._autowrap
+        w = xtext._wh[0]
+        initial_x = x
+        font = self.font
+        font_size = xtext._font_size
+        half_size = font_size >> 1
+        # 每行最后一个字最大x坐标
+        last_char_x = w - font_size
+        overlap = alpha != -1
 
+        word_frame = self._word_frame
+        half_word_frame = self._half_word_frame
+        word_buf = self._word_buf
         for char in xtext._context[begin_index:end_index]:
             # 对特殊字符的处理优化
             if char == "\n":
@@ -105,8 +252,67 @@ class XT_GUI:
             # 半角字符只绘制一半的像素量，速度会更快
             x += half_size if ord(char) <= 0x7F else font_size
 
+    def measure_text(self, text: str, font_size=None, wrap_width=None):
+        """测量文本，不需要绘制
+
+        与XText预处理、绘制使用相同的换行规则，短文本的结果会被缓存。
+
+        Args:
+            font_size: 字体大小，默认为字体的大小
+            wrap_width: 自动换行的宽度，为None时不自动换行
+
+        Returns:
+            (宽度, 行数, 每行起始位置在文本中的索引(最后一项为文本长度))
+            宽度是不发生自动换行需要的最小宽度，返回的元组不能修改
+        """
+        if font_size is None:
+            font_size = self.font.font_size
+        key = (text, font_size, wrap_width)
+        metrics = self._text_metrics.get(key)
+        if metrics is not None:
+            return metrics
+
+        half_size = font_size >> 1
+        breaks = [0]
+        newlines = 0
+        width = 0
+        x = 0
+        # 与绘制时相同，下一个字的x坐标超过该值时换行
+        last_char_x = (wrap_width if wrap_width is not None else 0) - font_size
+        for i, char in enumerate(text):
+            # 对特殊字符的处理优化
+            if ord(char) < 0x20 and char != "\n":
+                continue
+
+            # 自动换行
+            if wrap_width is not None and x > last_char_x:
+                breaks.append(i)
+                x = 0
+
+            if char == "\n":
+                if wrap_width is None:
+                    newlines += 1
+                    x = 0
+                else:
+                    x = wrap_width  # 下一个字换行
+                continue
+
+            if x + font_size > width:
+                width = x + font_size
+            x += half_size if ord(char) <= 0x7F else font_size
+        breaks.append(len(text))
+
+        metrics = (width, len(breaks) - 1 + newlines, tuple(breaks))
+        if len(text) <= _TEXT_METRICS_MAX_LEN:
+            cache = self._text_metrics
+            if len(cache) >= _TEXT_METRICS_SIZE:
+                cache.clear()
+            cache[key] = metrics
+        return metrics
+
     def draw_background(self):
         self.display.fill(0)
+        self.display.mark_dirty(0, self.height)
 
     def add_widget(self, widget: XWidget):
         self._top_layer_layout.add_widget(widget)
@@ -116,8 +322,8 @@ class XT_GUI:
 
     # @timed_function
     def refrash_frame(self):
-        """刷新帧，将帧数据写入显存"""
-        self.display.update_frame()
+        """刷新帧，将标记过的行写入显存，没有标记时写入整个帧"""
+        self.display.flush()
 
     async def print_debug_info(self):
         while True:
@@ -176,17 +382,43 @@ class XT_GUI:
         self,
         specified_layout: XLayout | None = None,
         children: list[XWidget] | tuple[XWidget, ...] | None = None,
-    ):
+        factory=None,
+    ) -> XLayout | None:
+        """添加图层并进入
+
+        Args:
+            specified_layout: 图层的容器，为None时使用全屏的XFrameLayout
+            children: 添加到图层的控件
+            factory: 创建图层容器的函数，设置时忽略specified_layout。
+                第一次进入时才创建容器，移除图层后容器保存在图层缓存中，再次进入时直接使用
+
+        Returns:
+            图层的容器，容器无效时返回None
+        """
+        cache_index = -1
+        if factory is not None:
+            cache_index = self._find_cached_layer(factory)
+            if cache_index < 0:
+                specified_layout = factory()
+            else:
+                specified_layout = self._layer_cache[cache_index][1]
+        # 先检查容器，无效时不修改图层缓存和快照
+        if hasattr(specified_layout, "unable_to_enter"):
+            print("Invalid layout")
+            return None
+        reused = cache_index >= 0
+        if reused:
+            self._layer_cache.pop(cache_index)
+
+        # 新图层会修改帧缓冲，必须先保存被覆盖的图层
+        self._push_layer_snapshot()
         if specified_layout is None:
             self._top_layer_layout = XFrameLayout(
                 (0, 0), (self.width, self.height), self.loop_focus
             )
-        elif not hasattr(specified_layout, "unable_to_enter"):
+        else:
             self._top_layer_layout = specified_layout
             specified_layout.set_parent(self.display)  # type: ignore
-        else:
-            print("Invalid layout")
-            return
 
         if isinstance(self._top_layer_layout, XFrameLayout):
             self._top_layer_layout._key_response(KEY_MOUSE0)
@@ -194,20 +426,59 @@ class XT_GUI:
             self._top_layer_layout._enter = True
 
         self.layer_stack.append(self._top_layer_layout)
+        self._layer_factories.append(factory)
         self.enter_widget(self._top_layer_layout)
         if children is not None:
             for widget in children:
                 self._top_layer_layout.add_widget(widget)
         self.draw_background()
+        if reused:
+            # 缓存的容器上次绘制的内容已经被其他图层覆盖
+            self._top_layer_layout._event_receiver(CLEAR_DRAW_AREA_EVENT)
+        return self._top_layer_layout
 
     def remove_layer(self):
-        self.layer_stack.pop()
+        layout = self.layer_stack.pop()
+        factory = self._layer_factories.pop()
+        if factory is not None and self._layer_cache_size:
+            # 最近使用的在末尾，超出数量时释放最久没有使用的图层
+            cache = self._layer_cache
+            cache.append((factory, layout))
+            if len(cache) > self._layer_cache_size:
+                cache.pop(0)
         if self.layer_stack:
             self._top_layer_layout = self.layer_stack[-1]
         else:
             self._top_layer_layout = self._bottom_layer_layout
-        self.draw_background()
-        self._top_layer_layout._event_receiver(CLEAR_DRAW_AREA_EVENT)
+        snapshot = self._layer_snapshots.pop() if self._layer_snapshots else None
+        if snapshot is not None:
+            # 直接恢复被覆盖时的像素，不需要重绘整个图层
+            self.display.unpack_frame(self._snapshot_buffer, *snapshot)
+        else:
+            self.draw_background()
+            self._top_layer_layout._event_receiver(CLEAR_DRAW_AREA_EVENT)
+
+    def _find_cached_layer(self, factory) -> int:
+        """返回factory创建的容器在图层缓存中的位置，不在缓存中时返回-1"""
+        cache = self._layer_cache
+        for i in range(len(cache)):
+            if cache[i][0] is factory:
+                return i
+        return -1
+
+    def _push_layer_snapshot(self):
+        """压缩保存当前帧缓冲，空间不足时记录None，移除图层时重绘"""
+        buffer = self._snapshot_buffer
+        if buffer is None:
+            return
+        snapshots = self._layer_snapshots
+        begin = 0
+        for snapshot in reversed(snapshots):
+            if snapshot is not None:
+                begin = snapshot[1]
+                break
+        end = self.display.pack_frame(buffer, begin)
+        snapshots.append((begin, end) if end >= 0 else None)
 
     def snapshot(self, _):
         print("截图")
@@ -236,7 +507,14 @@ class XT_GUI:
             with open(f"{dir}/snapshot_{next_index:04d}", "wb") as sn:
                 sn.write(self.display.buffer)
 
-    def __init__(self, display: DisplayAPI, font, loop_focus=True) -> None:
+    def __init__(
+        self,
+        display: DisplayAPI,
+        font,
+        loop_focus=True,
+        layer_snapshot_size=0,
+        layer_cache_size=2,
+    ) -> None:
         """初始化
         Args:
             Font: 等宽字体类
@@ -245,6 +523,8 @@ class XT_GUI:
                 get_bitmap(Char)    获取字符Char二值化点阵图的函数,返回行优先的点阵图
             cursor_img_file: .pbm(P4) 格式的文件
             loop_focus: 向前向后切换焦点是否循环
+            layer_snapshot_size: 图层快照缓冲区字节数，为0时不使用图层快照
+            layer_cache_size: 最多保存的由factory创建的已移除图层数量，为0时移除后直接释放
         """
         self.font = font
         self.display = display
@@ -263,6 +543,16 @@ class XT_GUI:
         self.enter_widget_stack: list[XCtrl] = list()
         # 绘制层栈，只绘制顶层布局的控件。用于进入页面覆盖显示。
         self.layer_stack: list[XLayout] = list()
+        # 图层快照，添加图层时压缩保存被覆盖的像素，移除图层时恢复
+        self._snapshot_buffer = (
+            bytearray(layer_snapshot_size) if layer_snapshot_size else None
+        )
+        self._layer_snapshots: list[tuple[int, int] | None] = []  # 与layer_stack对应
+        # 创建图层容器的函数，不是由函数创建的图层为None，与layer_stack对应
+        self._layer_factories: list = []
+        # 已移除的图层缓存[(创建函数, 容器)]，最近使用的在末尾
+        self._layer_cache: list[tuple] = []
+        self._layer_cache_size = layer_cache_size
 
         # 字体相关初始化
         font_size = font.font_size
@@ -278,6 +568,8 @@ class XT_GUI:
 
         # 调色板缓存
         self.pa_cache = framebuf.FrameBuffer(bytearray(4), 2, 1, framebuf.RGB565)
+        # 文本测量缓存{(文本, 字体大小, 换行宽度): 测量结果}
+        self._text_metrics: dict = {}
 
         gc.collect()
 
@@ -0,0 +1,143 @@
+"""在PC上将PNG等图片转换为XTEX原生纹理格式
+
+XTEX的像素数据就是framebuf的内存布局(RGB565为显示器字节序)，
+Texture2D加载时只需要一次readinto，不需要任何解码。
+
+用法:
+    python tools/png_to_xtex.py icon.png                  # 自动选择格式
+    python tools/png_to_xtex.py photo.png -m rgb565       # 真彩色
+    python tools/png_to_xtex.py mask.png -m gs4 -o a.xtex # 4位灰度，绘制时由XImage着色
+"""
+
+import argparse
+import struct
+
+import cv2
+import numpy as np
+
+# 与framebuf中的常量保持一致
+MONO_HLSB = 3
+RGB565 = 1
+GS2_HMSB = 5
+GS4_HMSB = 2
+GS8 = 6
+
+XTEX_MAGIC = b"XTEX"
+XTEX_VERSION = 1
+
+GRAY_MODES = {"gs1": (MONO_HLSB, 1), "gs2": (GS2_HMSB, 2), "gs4": (GS4_HMSB, 4), "gs8": (GS8, 8)}
+
+
+def load_bgr(path: str) -> np.ndarray:
+    """读取图片为BGR888，带Alpha通道的图片混合到黑色背景上"""
+    img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if img is None:
+        raise SystemExit(f"Cannot read image: {path}")
+    if img.dtype == np.uint16:
+        img = (img >> 8).astype(np.uint8)
+    if img.ndim == 2:
+        return cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    if img.shape[2] == 4:
+        alpha = img[:, :, 3:4].astype(np.uint16)
+        return (img[:, :, :3].astype(np.uint16) * alpha // 255).astype(np.uint8)
+    return img
+
+
+def rgb565_be(bgr: np.ndarray) -> np.ndarray:
+    """BGR888转换为显示器字节序(大端序)的RGB565，返回每个像素2字节"""
+    b = bgr[..., 0].astype(np.uint16) >> 3
+    g = bgr[..., 1].astype(np.uint16) >> 2
+    r = bgr[..., 2].astype(np.uint16) >> 3
+    color = (r << 11) | (g << 5) | b
+    return color.astype(">u2")
+
+
+def pack_rows(samples: np.ndarray, bitdepth: int) -> bytes:
+    """将每个像素的样本值按framebuf的内存布局打包，每行按字节对齐"""
+    if bitdepth == 8:
+        return samples.astype(np.uint8).tobytes()
+    per_byte = 8 // bitdepth
+    h, w = samples.shape
+    padded = np.zeros((h, -(-w // per_byte) * per_byte), dtype=np.uint8)
+    padded[:, :w] = samples
+    groups = padded.reshape(h, -1, per_byte)
+    packed = np.zeros(groups.shape[:2], dtype=np.uint8)
+    for i in range(per_byte):
+        if bitdepth == 2:
+            # GS2_HMSB: 第一个像素位于低位
+            shift = i * bitdepth
+        else:
+            # MONO_HLSB与GS4_HMSB: 第一个像素位于高位
+            shift = 8 - bitdepth * (i + 1)
+        packed |= groups[:, :, i] << shift
+    return packed.tobytes()
+
+
+def convert(bgr: np.ndarray, mode: str) -> tuple[int, bytes, bytes]:
+    """Returns:
+    (颜色模式, 调色板数据, 像素数据)
+    """
+    if mode == "rgb565":
+        return RGB565, b"", rgb565_be(bgr).tobytes()
+
+    if mode in GRAY_MODES:
+        color_mode, bitdepth = GRAY_MODES[mode]
+        gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+        samples = (gray.astype(np.uint16) * ((1 << bitdepth) - 1) + 127) // 255
+        return color_mode, b"", pack_rows(samples, bitdepth)
+
+    # 索引色: 使用图片中实际出现的颜色作为调色板
+    colors565 = rgb565_be(bgr)
+    palette, samples = np.unique(colors565.reshape(-1), return_inverse=True)
+    color_num = len(palette)
+    if color_num > 256:
+        raise SystemExit(f"Too many colors for index mode: {color_num}")
+    if color_num <= 2:
+        color_mode, bitdepth = MONO_HLSB, 1
+    elif color_num <= 4:
+        color_mode, bitdepth = GS2_HMSB, 2
+    elif color_num <= 16:
+        color_mode, bitdepth = GS4_HMSB, 4
+    else:
+        color_mode, bitdepth = GS8, 8
+    samples = samples.reshape(colors565.shape)
+    return color_mode, palette.astype(">u2").tobytes(), pack_rows(samples, bitdepth)
+
+
+def auto_mode(bgr: np.ndarray) -> str:
+    """颜色数不超过256时使用索引色，否则使用RGB565"""
+    color_num = len(np.unique(rgb565_be(bgr).reshape(-1)))
+    return "index" if color_num <= 256 else "rgb565"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert images to XTEX textures")
+    parser.add_argument("input", help="input image (PNG, BMP, JPEG...)")
+    parser.add_argument("-o", "--output", help="output file, default <input>.xtex")
+    parser.add_argument(
+        "-m",
+        "--mode",
+        choices=["auto", "rgb565", "index", *GRAY_MODES],
+        default="auto",
+        help="pixel format",
+    )
+    args = parser.parse_args()
+
+    bgr = load_bgr(args.input)
+    h, w = bgr.shape[:2]
+    if w > 0xFFFF or h > 0xFFFF:
+        raise SystemExit("Image too large")
+    mode = auto_mode(bgr) if args.mode == "auto" else args.mode
+    color_mode, palette, pixels = convert(bgr, mode)
+
+    output = args.output or args.input.rsplit(".", 1)[0] + ".xtex"
+    with open(output, "wb") as f:
+        f.write(XTEX_MAGIC)
+        f.write(struct.pack(">BBHHH", XTEX_VERSION, color_mode, w, h, len(palette) // 2))
+        f.write(palette)
+        f.write(pixels)
+    print(f"{args.input} -> {output}: {w}x{h} {mode}, {len(pixels)} bytes of pixels")
+
+
+if __name__ == "__main__":
+    main()